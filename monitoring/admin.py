@@ -88,7 +88,7 @@ class EnergyLogAdmin(admin.ModelAdmin):
 
 @admin.register(BuildingAlert)
 class BuildingAlertAdmin(admin.ModelAdmin):
-    list_display = ['id', 'zone', 'alert_type', 'severity', 'title', 'acknowledged', 'created_at']
+    list_display = ['id', 'zone', 'alert_type', 'severity', 'title', 'occurrence_count', 'acknowledged', 'resolved_at', 'created_at']
     list_filter = ['zone', 'alert_type', 'severity', 'acknowledged', 'created_at']
     search_fields = ['title', 'message']
     ordering = ['-created_at']
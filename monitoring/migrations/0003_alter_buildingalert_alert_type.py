@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_building_zone_zonecamera_hvaccontrol_energylog_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='buildingalert',
+            name='alert_type',
+            field=models.CharField(choices=[('TEMPERATURE', 'Temperature Alert'), ('HUMIDITY', 'Humidity Alert'), ('SECURITY', 'Security Alert'), ('ENERGY', 'Energy Alert'), ('HVAC', 'HVAC Malfunction'), ('DOOR', 'Door Alert'), ('MOTION', 'Motion Detected'), ('CO2', 'CO2 Alert'), ('LIGHT', 'Light Level Alert')], max_length=20),
+        ),
+    ]
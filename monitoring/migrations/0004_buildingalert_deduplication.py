@@ -0,0 +1,37 @@
+# Generated by Django 4.2.5 on 2026-10-17 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_alter_buildingalert_alert_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='buildingalert',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='buildingalert',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='buildingalert',
+            name='last_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='buildingalert',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='buildingalert',
+            index=models.Index(fields=['zone', 'alert_type', 'resolved_at'], name='alert_open_idx'),
+        ),
+    ]
@@ -7,7 +7,8 @@ This module organizes models into logical groups:
 - sensor: ZoneSensor, ZoneCamera (Smart Building sensors)
 - control: HVACControl, EnergyLog (Smart Building controls)
 - alert: BuildingAlert (Smart Building alerts)
-- mongodb: Reading, ReadingClient (MongoDB integration)
+- mongodb: Reading, ReadingClient, get_reading_client (MongoDB integration)
+- archive: ReadingArchive, get_reading_archive (Parquet archive of old readings)
 """
 
 # Base IoT models
@@ -20,7 +21,8 @@ from .control import HVACControl, EnergyLog
 from .alert import BuildingAlert
 
 # MongoDB models
-from .mongodb import Reading, ReadingClient
+from .mongodb import Reading, ReadingClient, BulkInsertResult, Bucket, get_reading_client
+from .archive import ReadingArchive, get_reading_archive
 
 # Export all models
 __all__ = [
@@ -46,4 +48,11 @@ __all__ = [
     # MongoDB
     'Reading',
     'ReadingClient',
+    'BulkInsertResult',
+    'Bucket',
+    'get_reading_client',
+    
+    # Archive
+    'ReadingArchive',
+    'get_reading_archive',
 ]
@@ -18,6 +18,8 @@ class BuildingAlert(models.Model):
         ('HVAC', 'HVAC Malfunction'), # Cảnh báo hệ thống HVAC
         ('DOOR', 'Door Alert'), # Cảnh báo cửa
         ('MOTION', 'Motion Detected'), # Cảnh báo chuyển động
+        ('CO2', 'CO2 Alert'), # Cảnh báo nồng độ CO2
+        ('LIGHT', 'Light Level Alert'), # Cảnh báo ánh sáng
     ]
     
     SEVERITY_CHOICES = [
@@ -42,12 +44,21 @@ class BuildingAlert(models.Model):
     acknowledged_by = models.ForeignKey(AuthUser, on_delete=models.SET_NULL, null=True, blank=True)
     acknowledged_at = models.DateTimeField(null=True, blank=True)
     
+    # Deduplication: one open alert per (zone, alert_type) until resolved
+    occurrence_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    last_notified_at = models.DateTimeField(null=True, blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    
     # Camera recording
     camera = models.ForeignKey(ZoneCamera, on_delete=models.SET_NULL, null=True, blank=True)
     video_recording_path = models.CharField(max_length=500, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['zone', 'alert_type', 'resolved_at'], name='alert_open_idx'),
+        ]
     
     def __str__(self):
         return f"[{self.severity}] {self.title}"
@@ -0,0 +1,224 @@
+"""
+Parquet archive of raw readings - one columnar file per device and day
+
+Layout (Hive-style partitions, so pyarrow.dataset, DuckDB or Spark can read
+the whole tree directly):
+
+    <READINGS_ARCHIVE_DIR>/device_id=<id>/date=<YYYY-MM-DD>/readings.parquet
+    <READINGS_ARCHIVE_DIR>/_watermark
+
+Non-numeric device ids are stored URL-encoded as <id> and read back as
+strings; a numeric string id shares the directory of the same int id.
+
+Days before the watermark are served from the archive, later days from
+MongoDB (see ReadingClient.iter_history). Needs pyarrow; without it the
+archive is unavailable and raw readings stay in MongoDB.
+"""
+
+import datetime
+import glob
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from django.conf import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE = "readings.parquet"
+WATERMARK_FILE = "_watermark"
+
+
+def naive_utc(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Aware datetimes -> naive UTC (how pymongo returns dates)"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def device_order_key(device_id: Any) -> Tuple[int, Any, str]:
+    """Sort key matching MongoDB's order of device ids: numbers first, then text"""
+    if isinstance(device_id, (int, float)) and not isinstance(device_id, bool):
+        return (0, device_id, '')
+    return (1, 0, str(device_id))
+
+
+def _partition_device_id(name: str) -> Any:
+    """device_id=<id> directory value -> device id (int when numeric)"""
+    value = unquote(name)
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def _tmp_path(path: str) -> str:
+    """Per-writer temporary name, replaced onto path atomically"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _float(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+class ReadingArchive:
+    """Reads and writes the per-device, per-day Parquet files"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = str(root or getattr(settings, "READINGS_ARCHIVE_DIR", "archive"))
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """pyarrow is installed"""
+        return pa is not None
+
+    def _path(self, device_id: Any, day: datetime.date) -> str:
+        partition = f"device_id={quote(str(device_id), safe='')}"
+        return os.path.join(self.root, partition, f"date={day.isoformat()}", ARCHIVE_FILE)
+
+    def watermark(self) -> Optional[datetime.datetime]:
+        """Midnight (naive UTC) of the first day not archived, None if nothing is"""
+        try:
+            with open(os.path.join(self.root, WATERMARK_FILE)) as f:
+                return datetime.datetime.fromisoformat(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    def set_watermark(self, value: datetime.datetime):
+        """Move the watermark forward (never back)"""
+        with self._lock:
+            current = self.watermark()
+            if current is not None and current >= value:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            path = os.path.join(self.root, WATERMARK_FILE)
+            tmp = _tmp_path(path)
+            with open(tmp, "w") as f:
+                f.write(value.isoformat())
+            os.replace(tmp, path)
+
+    def write_day(self, device_id: Any, day: datetime.date, readings: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write a device's readings of one day, merged with the existing file
+
+        Readings are deduplicated on timestamp (newest write wins) and sorted,
+        and the file is replaced atomically, so re-archiving a day - e.g.
+        after late readings arrived - is safe.
+
+        Returns:
+            Number of readings in the file
+
+        Raises:
+            RuntimeError if pyarrow is not installed
+        """
+        if not self.available:
+            raise RuntimeError("pyarrow is required for the reading archive")
+        path = self._path(device_id, day)
+        rows: Dict[datetime.datetime, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            for row in pq.read_table(path).to_pylist():
+                rows[row["timestamp"]] = row
+        for reading in readings:
+            timestamp = naive_utc(reading["timestamp"])
+            rows[timestamp] = {
+                "timestamp": timestamp,
+                "temperature": _float(reading.get("temperature")),
+                "humidity": _float(reading.get("humidity")),
+            }
+
+        ordered = [rows[timestamp] for timestamp in sorted(rows)]
+        table = pa.table({
+            "timestamp": pa.array([row["timestamp"] for row in ordered], pa.timestamp("ms")),
+            "temperature": pa.array([row["temperature"] for row in ordered], pa.float64()),
+            "humidity": pa.array([row["humidity"] for row in ordered], pa.float64()),
+        })
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = _tmp_path(path)
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+        return len(ordered)
+
+    def _read_day(self, device_id: Any, day: datetime.date) -> List[Dict[str, Any]]:
+        path = self._path(device_id, day)
+        if not os.path.exists(path):
+            return []
+        rows = pq.read_table(path).to_pylist()
+        for row in rows:
+            row["device_id"] = device_id
+        return rows
+
+    def _first_day(self) -> Optional[datetime.date]:
+        days = [
+            os.path.basename(os.path.dirname(path))[len("date="):]
+            for path in glob.glob(os.path.join(self.root, "device_id=*", "date=*", ARCHIVE_FILE))
+        ]
+        return datetime.date.fromisoformat(min(days)) if days else None
+
+    def _device_ids(self, day: datetime.date) -> List[Any]:
+        pattern = os.path.join(self.root, "device_id=*", f"date={day.isoformat()}", ARCHIVE_FILE)
+        return sorted((
+            _partition_device_id(os.path.basename(os.path.dirname(os.path.dirname(path)))[len("device_id="):])
+            for path in glob.glob(pattern)
+        ), key=device_order_key)
+
+    def iter_readings(self, device_id: Optional[Any] = None,
+                      since: Optional[datetime.datetime] = None,
+                      until: Optional[datetime.datetime] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Archived readings in [since, until), oldest first, one day in memory at a time
+
+        Only days before the watermark are read.
+
+        Args:
+            device_id: Only this device (default: all devices, ordered by
+                (timestamp, device_id) like ReadingClient.iter_readings)
+            since / until: Time range (default: everything archived)
+
+        Yields:
+            {device_id, timestamp (naive UTC), temperature, humidity}
+        """
+        if not self.available:
+            return
+        watermark = self.watermark()
+        if watermark is None:
+            return
+        since, until = naive_utc(since), naive_utc(until)
+        last = watermark.date() - datetime.timedelta(days=1)
+        if until is not None:
+            last = min(last, (until - datetime.timedelta(microseconds=1)).date())
+        day = since.date() if since is not None else self._first_day()
+        while day is not None and day <= last:
+            if device_id is not None:
+                rows = self._read_day(device_id, day)
+            else:
+                rows = [row for device in self._device_ids(day) for row in self._read_day(device, day)]
+                rows.sort(key=lambda row: (row["timestamp"], device_order_key(row["device_id"])))
+            for row in rows:
+                if (since is None or row["timestamp"] >= since) and (until is None or row["timestamp"] < until):
+                    yield row
+            day += datetime.timedelta(days=1)
+
+
+_archive: Optional[ReadingArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_reading_archive() -> ReadingArchive:
+    """Get the process-wide ReadingArchive (READINGS_ARCHIVE_DIR)"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = ReadingArchive()
+    return _archive
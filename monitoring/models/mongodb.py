@@ -2,13 +2,213 @@
 MongoDB models - Reading dataclass and ReadingClient
 """
 
-from dataclasses import dataclass, asdict
-from typing import Optional, List, Dict, Any
+from collections import Counter
+from dataclasses import dataclass, asdict, field
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
 import datetime
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from django.conf import settings
-from pymongo import MongoClient
-from pymongo.errors import PyMongoError
+from bson import ObjectId
+from pymongo import MongoClient, UpdateMany, UpdateOne
+from pymongo.errors import (
+    PyMongoError, BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure,
+)
+
+from .archive import device_order_key, get_reading_archive, naive_utc
+
+logger = logging.getLogger(__name__)
+
+# MongoDB error code for unique index violations
+DUPLICATE_KEY_ERROR = 11000
+
+# _id of the all-devices document in the reading counters collection
+COUNTER_TOTAL_ID = "total"
+
+# Fields returned by reading queries (anything else stored on a document is
+# left on the server)
+READING_PROJECTION = {"device_id": 1, "temperature": 1, "humidity": 1, "timestamp": 1}
+
+# Numeric reading fields summarized per time bucket (min/max/sum/count)
+DOWNSAMPLE_FIELDS = ("temperature", "humidity")
+
+# Bucket size suffix -> $dateTrunc unit, seconds per unit
+BUCKET_UNITS = {"m": ("minute", 60), "h": ("hour", 3600), "d": ("day", 86400)}
+
+# $dateTrunc counts bins of binSize > 1 from this instant
+BUCKET_ORIGIN = datetime.datetime(2000, 1, 1)
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """A downsampling bucket size such as 5m, 1h or 1d"""
+    unit: str
+    bin_size: int
+    seconds: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Bucket":
+        """
+        Parse '<n>m', '<n>h' or '<n>d' (1 minute to 1 day)
+
+        Raises:
+            ValueError if the bucket is malformed or out of range
+        """
+        value = (value or "").strip().lower()
+        if len(value) < 2 or value[-1] not in BUCKET_UNITS or not value[:-1].isdigit():
+            raise ValueError(f"Invalid bucket {value!r}, expected e.g. 1m, 15m, 1h, 1d")
+        unit, unit_seconds = BUCKET_UNITS[value[-1]]
+        bin_size = int(value[:-1])
+        seconds = bin_size * unit_seconds
+        if not 60 <= seconds <= 86400:
+            raise ValueError("Bucket must be between 1m and 1d")
+        return cls(unit, bin_size, seconds)
+
+    @property
+    def label(self) -> str:
+        """Short form, e.g. '15m'"""
+        return f"{self.bin_size}{self.unit[0]}"
+
+    def floor(self, value: datetime.datetime) -> datetime.datetime:
+        """
+        Start of the bucket containing value, as $dateTrunc computes it
+
+        Aware datetimes are converted to UTC; naive ones are taken as UTC
+        (like pymongo does) and stay naive.
+        """
+        aware = value.tzinfo is not None
+        if aware:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        step = datetime.timedelta(seconds=self.seconds)
+        start = BUCKET_ORIGIN + (value - BUCKET_ORIGIN) // step * step
+        return start.replace(tzinfo=datetime.timezone.utc) if aware else start
+
+    def ceil(self, value: datetime.datetime) -> datetime.datetime:
+        """End of the bucket containing value (value itself on a boundary)"""
+        start = self.floor(value)
+        if start == value:
+            return start
+        return start + datetime.timedelta(seconds=self.seconds)
+
+# Pre-aggregated rollups maintained at ingest, finest first. Each level is a
+# collection "<readings collection>_<label>" with one document per
+# (device_id, bucket) holding count and <field>_min/_max/_sum/_count.
+ROLLUP_LEVELS = (Bucket("minute", 1, 60), Bucket("hour", 1, 3600), Bucket("day", 1, 86400))
+
+# _id of the rollup watermark document: buckets starting at or after its
+# "start" hold every inserted reading (earlier ones predate the rollups)
+ROLLUP_START_ID = "start"
+
+# Seconds a process reuses the rollup watermark before reading it again
+ROLLUP_START_CACHE_SECONDS = 60
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    """Naive datetimes are UTC (as stored by pymongo)"""
+    return value if value.tzinfo is not None else value.replace(tzinfo=datetime.timezone.utc)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _bucket_group(bucket: Bucket, date_field: str, from_rollup: bool) -> Dict[str, Any]:
+    """
+    $group stage summarizing per (device_id, bucket)
+
+    Args:
+        bucket: Bucket size
+        date_field: Date to truncate ("$timestamp" or a rollup's "$bucket")
+        from_rollup: Combine rollup documents instead of raw readings
+    """
+    group: Dict[str, Any] = {
+        "_id": {
+            "device_id": "$device_id",
+            "bucket": {"$dateTrunc": {"date": date_field, "unit": bucket.unit, "binSize": bucket.bin_size}},
+        },
+        "count": {"$sum": "$count" if from_rollup else 1},
+    }
+    for name in DOWNSAMPLE_FIELDS:
+        if from_rollup:
+            group[f"{name}_min"] = {"$min": f"${name}_min"}
+            group[f"{name}_max"] = {"$max": f"${name}_max"}
+            group[f"{name}_sum"] = {"$sum": f"${name}_sum"}
+            group[f"{name}_count"] = {"$sum": f"${name}_count"}
+        else:
+            value = f"${name}"
+            group[f"{name}_min"] = {"$min": value}
+            group[f"{name}_max"] = {"$max": value}
+            group[f"{name}_sum"] = {"$sum": value}
+            group[f"{name}_count"] = {"$sum": {"$cond": [{"$isNumber": value}, 1, 0]}}
+    return group
+
+
+# Process-wide registry: one MongoClient (connection pool + monitor threads)
+# per URI, one ReadingClient per (uri, db, collection), indexes ensured once.
+# MongoClient is not fork-safe, so the registry is dropped in forked children.
+_registry_lock = threading.Lock()
+_mongo_clients: Dict[str, MongoClient] = {}
+_reading_clients: Dict[Tuple[str, str, str], "ReadingClient"] = {}
+_indexed_collections: Set[Tuple[str, str, str]] = set()
+_registry_pid = os.getpid()
+
+
+def _reset_registry():
+    """Forget all pooled clients (called in the child after fork)"""
+    global _registry_lock, _registry_pid
+    _registry_lock = threading.Lock()
+    _mongo_clients.clear()
+    _reading_clients.clear()
+    _indexed_collections.clear()
+    _registry_pid = os.getpid()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_registry)
+
+
+def get_mongo_client(uri: str) -> MongoClient:
+    """Get or create the pooled MongoClient for a URI (pool size and timeouts from settings)"""
+    if os.getpid() != _registry_pid:
+        _reset_registry()
+    client = _mongo_clients.get(uri)
+    if client is None:
+        with _registry_lock:
+            client = _mongo_clients.get(uri)
+            if client is None:
+                client = MongoClient(
+                    uri,
+                    maxPoolSize=getattr(settings, "MONGODB_MAX_POOL_SIZE", 100),
+                    minPoolSize=getattr(settings, "MONGODB_MIN_POOL_SIZE", 0),
+                    connectTimeoutMS=getattr(settings, "MONGODB_CONNECT_TIMEOUT_MS", 5000),
+                    serverSelectionTimeoutMS=getattr(settings, "MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000),
+                    socketTimeoutMS=getattr(settings, "MONGODB_SOCKET_TIMEOUT_MS", 10000),
+                    waitQueueTimeoutMS=getattr(settings, "MONGODB_WAIT_QUEUE_TIMEOUT_MS", 2000),
+                )
+                _mongo_clients[uri] = client
+    return client
+
+
+def get_reading_client(uri: Optional[str] = None, db_name: Optional[str] = None,
+                       collection_name: Optional[str] = None) -> "ReadingClient":
+    """Get the shared ReadingClient for (uri, db, collection) in this process"""
+    uri = uri or getattr(settings, "MONGODB_URI", "mongodb://localhost:27017")
+    db_name = db_name or getattr(settings, "MONGODB_DB_NAME", "iot")
+    collection_name = collection_name or getattr(settings, "MONGODB_READINGS_COLLECTION", "readings")
+    if os.getpid() != _registry_pid:
+        _reset_registry()
+    key = (uri, db_name, collection_name)
+    client = _reading_clients.get(key)
+    if client is None:
+        with _registry_lock:
+            client = _reading_clients.get(key)
+            if client is None:
+                client = ReadingClient(uri, db_name, collection_name)
+                _reading_clients[key] = client
+    return client
 
 
 @dataclass
@@ -24,56 +224,834 @@ class Reading:
         return asdict(self)
 
 
+@dataclass
+class BulkInsertResult:
+    """Outcome of ReadingClient.insert_readings"""
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    # Positions (in the input list) of readings that were not inserted
+    duplicate_indexes: List[int] = field(default_factory=list)
+    failed_indexes: List[int] = field(default_factory=list)
+
+
 class ReadingClient:
-    """MongoDB client for sensor readings"""
+    """
+    MongoDB client for sensor readings
+
+    Readings live in a regular collection with a unique (device_id, timestamp)
+    index, or - with timeseries=True (MONGODB_READINGS_TIMESERIES) - in a
+    time-series collection (timeField=timestamp, metaField=device_id).
+    Time-series collections cannot have unique indexes, so there every
+    reading first claims its (device_id, timestamp) key in the
+    "<collection>_keys" collection, whose _id is unique and whose documents
+    expire after MONGODB_DEDUP_KEY_TTL_SECONDS (longer than any redelivery).
+    Keys are released again whenever the reading insert raises, but if the
+    process dies between the two writes the key stays claimed with no
+    reading behind it, and a redelivery of that reading is dropped as a
+    duplicate until the key expires.
+
+    Reading counts per device and in total are kept in "<collection>_counters"
+    as readings are inserted and deleted through this client, so stats never
+    scan the collection. Readings removed behind its back (time-series
+    expiry, manual deletes) are only reflected after rebuild_counters().
+    """
     
-    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None, collection_name: str = "readings"):
+    def __init__(self, uri: Optional[str] = None, db_name: Optional[str] = None,
+                 collection_name: Optional[str] = None, timeseries: Optional[bool] = None):
         self.uri = uri or getattr(settings, "MONGODB_URI", "mongodb://localhost:27017")
         self.db_name = db_name or getattr(settings, "MONGODB_DB_NAME", "iot")
-        self.collection_name = collection_name
+        self.collection_name = collection_name or getattr(settings, "MONGODB_READINGS_COLLECTION", "readings")
+        if timeseries is None:
+            timeseries = getattr(settings, "MONGODB_READINGS_TIMESERIES", False)
+        self.timeseries = timeseries
+        self.rollups_enabled = getattr(settings, "READINGS_ROLLUPS_ENABLED", True)
         self._client: Optional[MongoClient] = None
         self._collection = None
+        self._pid: Optional[int] = None
+        self._seed_lock = threading.Lock()
+        self._seeding = False
+        self._rollup_start: Optional[Tuple[Optional[datetime.datetime], float]] = None
+        self._rollup_start_marked = False
 
     def _connect(self):
-        """Establish MongoDB connection and create indexes"""
-        if self._client is None:
-            self._client = MongoClient(self.uri)
+        """Attach to the pooled MongoDB client and ensure indexes (once per process)"""
+        if self._client is None or self._pid != os.getpid():
+            self._client = get_mongo_client(self.uri)
             self._collection = self._client[self.db_name][self.collection_name]
-            # Create unique compound index to prevent duplicates
+            self._pid = os.getpid()
+        self._ensure_indexes()
+
+    def _rollup(self, level: Bucket):
+        """Collection of a ROLLUP_LEVELS level (after _connect)"""
+        return self._client[self.db_name][f"{self.collection_name}_{level.label}"]
+
+    def _rollup_meta(self):
+        """Rollup watermark collection (after _connect)"""
+        return self._client[self.db_name][f"{self.collection_name}_rollups"]
+
+    def _keys(self):
+        """Dedup key collection of the time-series mode (after _connect)"""
+        return self._client[self.db_name][f"{self.collection_name}_keys"]
+
+    def _counters(self):
+        """Reading counters collection (after _connect)"""
+        return self._client[self.db_name][f"{self.collection_name}_counters"]
+
+    def _count_readings(self, deltas: Dict[Any, int]):
+        """
+        Add per-device deltas (negative for deletes) to the reading counters
+
+        One unordered bulk_write of $inc upserts, including the total. A
+        failure is logged, not raised - the readings themselves are stored.
+        """
+        deltas = {device_id: delta for device_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        operations = [
+            UpdateOne({"_id": device_id}, {"$inc": {"count": delta}}, upsert=True)
+            for device_id, delta in deltas.items()
+        ]
+        operations.append(UpdateOne({"_id": COUNTER_TOTAL_ID}, {"$inc": {"count": sum(deltas.values())}}, upsert=True))
+        try:
+            self._counters().bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            logger.error("Reading counters not updated (run scripts/rebuild_counters.py): %s", e)
+
+    def reading_counts(self) -> Tuple[int, List[Dict[str, Any]], bool]:
+        """
+        Reading totals from the counters, O(devices)
+
+        Counters start from the first ingest after an upgrade, so until they
+        are seeded (rebuild_counters(), started here in the background) the
+        total falls back to estimated_document_count() (collection metadata)
+        and no per-device counts are returned.
+
+        Returns:
+            (total, [{_id: device_id, count}] sorted by device_id, from_counters)
+        """
+        self._connect()
+        seeded = False
+        total = 0
+        by_device = []
+        for doc in self._counters().find({}):
+            if doc["_id"] == COUNTER_TOTAL_ID:
+                seeded = bool(doc.get("seeded"))
+                total = doc.get("count", 0)
+            elif doc.get("count"):
+                by_device.append({"_id": doc["_id"], "count": doc["count"]})
+        if not seeded:
+            self._seed_counters_in_background()
+            return self._collection.estimated_document_count(), [], False
+        by_device.sort(key=lambda row: row["_id"])
+        return total, by_device, True
+
+    def exact_reading_counts(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Reading totals by scanning the collection (slow)
+
+        Returns:
+            (total, [{_id: device_id, count}] sorted by device_id)
+        """
+        self._connect()
+        by_device = list(self._collection.aggregate([
+            {"$group": {"_id": "$device_id", "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ], allowDiskUse=True))
+        return sum(row["count"] for row in by_device), by_device
+
+    def rebuild_counters(self) -> int:
+        """
+        Set the counters to exact counts and mark them seeded
+
+        Readings inserted before the scan started are counted with one
+        $group scan, newer ones with a second, small scan on the _id index;
+        every counter is then $set, replacing the deltas ingest added
+        meanwhile. Only a batch inserted between the second scan and the
+        $set can be missed or counted twice; rebuild with ingest stopped for
+        an exact count.
+
+        Returns:
+            Total number of readings
+        """
+        self._connect()
+        boundary = ObjectId.from_datetime(datetime.datetime.utcnow())
+        counts: Counter = Counter()
+        for match in ({"_id": {"$lt": boundary}}, {"_id": {"$gte": boundary}}):
+            for row in self._collection.aggregate([
+                {"$match": match},
+                {"$group": {"_id": "$device_id", "count": {"$sum": 1}}},
+            ], allowDiskUse=True):
+                counts[row["_id"]] += row["count"]
+        total = sum(counts.values())
+        operations = [
+            UpdateOne({"_id": device_id}, {"$set": {"count": count}}, upsert=True)
+            for device_id, count in counts.items()
+        ]
+        operations.append(UpdateMany(
+            {"_id": {"$nin": [COUNTER_TOTAL_ID, *counts]}}, {"$set": {"count": 0}}
+        ))
+        operations.append(UpdateOne(
+            {"_id": COUNTER_TOTAL_ID}, {"$set": {"count": total, "seeded": True}}, upsert=True
+        ))
+        self._counters().bulk_write(operations, ordered=True)
+        return total
+
+    def _seed_counters_in_background(self):
+        """Start rebuild_counters() in a daemon thread, once per client"""
+        with self._seed_lock:
+            if self._seeding:
+                return
+            self._seeding = True
+
+        def seed():
             try:
-                self._collection.create_index(
-                    [("device_id", 1), ("timestamp", 1)],
-                    unique=True,
-                    background=True
-                )
-            except Exception:
-                pass  # Index already exists
+                total = self.rebuild_counters()
+                logger.info("✓ Seeded reading counters: %d readings", total)
+            except PyMongoError as e:
+                logger.error("Failed to seed reading counters: %s", e)
+            finally:
+                with self._seed_lock:
+                    self._seeding = False
+
+        threading.Thread(target=seed, name="reading-counters-seed", daemon=True).start()
+
+    def _ensure_timeseries(self):
+        """
+        Create the time-series collection, or sync its expiry if it exists
+
+        Raises:
+            PyMongoError if the server is unreachable
+        """
+        db = self._client[self.db_name]
+        expire_days = getattr(settings, "MONGODB_READINGS_EXPIRE_DAYS", 0)
+        options: Dict[str, Any] = {"timeseries": {
+            "timeField": "timestamp",
+            "metaField": "device_id",
+            "granularity": getattr(settings, "MONGODB_TIMESERIES_GRANULARITY", "seconds"),
+        }}
+        if expire_days:
+            options["expireAfterSeconds"] = int(expire_days * 86400)
+        try:
+            db.create_collection(self.collection_name, **options)
+            logger.info("✓ Created time-series collection %s", self.collection_name)
+            return
+        except CollectionInvalid:
+            pass
+
+        existing = next(db.list_collections(filter={"name": self.collection_name}), {})
+        if existing.get("type") != "timeseries":
+            logger.error("%s is a regular collection; copy it into a time-series collection "
+                         "with scripts/migrate_timeseries.py", self.collection_name)
+            return
+        try:
+            db.command("collMod", self.collection_name,
+                       expireAfterSeconds=options.get("expireAfterSeconds", "off"))
+        except OperationFailure as e:
+            logger.debug("Expiry of %s not updated: %s", self.collection_name, e)
+
+    def _ensure_indexes(self):
+        """Create the reading (and rollup) indexes once per process"""
+        key = (self.uri, self.db_name, self.collection_name)
+        if key in _indexed_collections:
+            return
+        if self.timeseries:
+            try:
+                self._ensure_timeseries()
+            except PyMongoError as e:
+                logger.warning("Could not ensure time-series collection %s: %s", self.collection_name, e)
+                return
+        indexes = [
+            # Unique compound index to prevent duplicates (time-series: dedup
+            # keys instead, see class docstring); serves per-device queries
+            (self._collection, [("device_id", 1), ("timestamp", 1)], {"unique": not self.timeseries}),
+            # All-devices feed in (timestamp, device_id) order
+            (self._collection, [("timestamp", -1), ("device_id", -1)], {}),
+        ]
+        if self.timeseries:
+            indexes.append((self._keys(), [("at", 1)], {
+                "expireAfterSeconds": getattr(settings, "MONGODB_DEDUP_KEY_TTL_SECONDS", 7 * 86400),
+            }))
+        if self.rollups_enabled:
+            # One document per (device, bucket); upserts and $merge match on it
+            indexes.extend(
+                (self._rollup(level), [("device_id", 1), ("bucket", 1)], {"unique": True})
+                for level in ROLLUP_LEVELS
+            )
+        for collection, keys, options in indexes:
+            try:
+                collection.create_index(keys, background=True, **options)
+            except OperationFailure as e:
+                logger.debug("Index on %s not created: %s", collection.name, e)
+            except PyMongoError as e:
+                # Server unreachable - retry on next use
+                logger.warning("Could not ensure indexes on %s: %s", collection.name, e)
+                return
+        _indexed_collections.add(key)
 
     def insert_reading(self, reading: Reading) -> Optional[str]:
         """Insert a sensor reading into MongoDB"""
         try:
             self._connect()
             doc = reading.to_dict()
-            res = self._collection.insert_one(doc)
+            if self.timeseries:
+                self._keys().insert_one(self._key_doc(doc))
+                try:
+                    res = self._collection.insert_one(doc)
+                except BaseException:
+                    # Includes shutdown (SystemExit/KeyboardInterrupt)
+                    self._release_keys([doc])
+                    raise
+            else:
+                res = self._collection.insert_one(doc)
+            self._count_readings({reading.device_id: 1})
             return str(res.inserted_id)
+        except DuplicateKeyError:
+            # Duplicate readings are expected (unique device_id + timestamp index)
+            logger.debug("Duplicate reading ignored: device_id=%s, timestamp=%s",
+                         reading.device_id, reading.timestamp)
+            return None
         except PyMongoError as e:
-            import logging
-            # DuplicateKeyError is expected for duplicate readings, just log debug
-            if 'duplicate key error' in str(e).lower():
-                logging.debug(f"Duplicate reading ignored: device_id={reading.device_id}, timestamp={reading.timestamp}")
-                return None
-            logging.error(f"PyMongoError in insert_reading: {e}")
+            logger.error("PyMongoError in insert_reading: %s", e)
             return None
         except Exception as e:
-            import logging
-            logging.error(f"Unexpected error in insert_reading: {e}")
+            logger.error("Unexpected error in insert_reading: %s", e)
             return None
 
+    @staticmethod
+    def _key_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "_id": {"device_id": doc["device_id"], "timestamp": doc["timestamp"]},
+            "at": datetime.datetime.utcnow(),
+        }
+
+    def _release_keys(self, docs: List[Dict[str, Any]]):
+        """Drop the dedup keys of readings that were not stored, so a retry can store them"""
+        if not docs:
+            return
+        try:
+            self._keys().delete_many({"_id": {"$in": [self._key_doc(doc)["_id"] for doc in docs]}})
+        except PyMongoError as e:
+            logger.error("Could not release %d dedup key(s); a retry will skip them as duplicates: %s",
+                         len(docs), e)
+
+    @staticmethod
+    def _count_errors(error: BulkWriteError, positions: List[int], result: BulkInsertResult) -> Set[int]:
+        """
+        Tally the per-document errors of an unordered insert_many on result
+
+        Args:
+            positions: Input-list position of each document sent
+
+        Returns:
+            Indexes (in the sent chunk) of the documents that were rejected
+        """
+        rejected = set()
+        for write_error in error.details.get('writeErrors', []):
+            rejected.add(write_error['index'])
+            index = positions[write_error['index']]
+            if write_error.get('code') == DUPLICATE_KEY_ERROR:
+                result.duplicates += 1
+                result.duplicate_indexes.append(index)
+            else:
+                result.failed += 1
+                result.failed_indexes.append(index)
+                logger.error("Bulk insert failed for reading #%d: %s", index, write_error.get('errmsg'))
+        return rejected
+
+    def insert_readings(self, readings: Iterable[Reading], batch_size: int = 1000) -> BulkInsertResult:
+        """
+        Bulk insert sensor readings with unordered insert_many calls
+
+        Each chunk of batch_size documents is one round trip (two in the
+        time-series mode: dedup keys first, then the new readings). Duplicate
+        (device_id, timestamp) readings are counted, not raised; any other
+        per-document write error is counted as failed.
+
+        Raises:
+            PyMongoError for errors that are not per-document write errors
+            (e.g. connection failures), so callers can retry the whole batch.
+        """
+        self._connect()
+        docs = [reading.to_dict() for reading in readings]
+        result = BulkInsertResult()
+
+        for offset in range(0, len(docs), batch_size):
+            positions = list(range(offset, min(offset + batch_size, len(docs))))
+            if self.timeseries:
+                try:
+                    self._keys().insert_many([self._key_doc(docs[index]) for index in positions], ordered=False)
+                except BulkWriteError as e:
+                    rejected = self._count_errors(e, positions, result)
+                    positions = [index for i, index in enumerate(positions) if i not in rejected]
+                except BaseException:
+                    # Outcome unknown (includes shutdown): free any key this call claimed
+                    self._release_keys([docs[index] for index in positions])
+                    raise
+                if not positions:
+                    continue
+
+            chunk = [docs[index] for index in positions]
+            rejected = set()
+            try:
+                res = self._collection.insert_many(chunk, ordered=False)
+                result.inserted += len(res.inserted_ids)
+            except BulkWriteError as e:
+                result.inserted += e.details.get('nInserted', 0)
+                rejected = self._count_errors(e, positions, result)
+                if self.timeseries:
+                    self._release_keys([chunk[i] for i in rejected])
+            except BaseException:
+                # Outcome unknown (includes shutdown): rather risk a duplicate
+                # on retry than lose readings
+                if self.timeseries:
+                    self._release_keys(chunk)
+                raise
+            self._count_readings(Counter(doc["device_id"] for i, doc in enumerate(chunk) if i not in rejected))
+
+        logger.debug("insert_readings: inserted=%d, duplicates=%d, failed=%d",
+                     result.inserted, result.duplicates, result.failed)
+        return result
+
     def find_readings(self, device_id: int, limit: int = 100, since: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
         """Find sensor readings for a device"""
         self._connect()
         query: Dict[str, Any] = {"device_id": device_id}
         if since is not None:
             query["timestamp"] = {"$gte": since}
-        cursor = self._collection.find(query).sort("timestamp", -1).limit(limit)
+        cursor = self._collection.find(query, READING_PROJECTION).sort("timestamp", -1).limit(limit)
         return list(cursor)
+
+    def find_readings_page(self, device_id: int, limit: int = 100,
+                           before: Optional[datetime.datetime] = None,
+                           after: Optional[datetime.datetime] = None,
+                           since: Optional[datetime.datetime] = None,
+                           inclusive: bool = False) -> List[Dict[str, Any]]:
+        """
+        Keyset page of a device's readings on the (device_id, timestamp) index
+
+        Each page is one index range scan of at most limit documents, however
+        deep in the history it starts.
+
+        Args:
+            device_id: Device ID
+            limit: Page size
+            before: Only readings older than this timestamp (next page)
+            after: Only readings newer than this timestamp (previous page)
+            since: Only readings at or after this timestamp
+            inclusive: Also include readings exactly at before/after
+
+        Returns:
+            Up to limit readings, newest first
+        """
+        self._connect()
+        bounds = []
+        if since is not None:
+            bounds.append({"$gte": since})
+        if before is not None:
+            bounds.append({"$lte" if inclusive else "$lt": before})
+        if after is not None:
+            bounds.append({"$gte" if inclusive else "$gt": after})
+
+        query: Dict[str, Any] = {"device_id": device_id}
+        if len(bounds) == 1:
+            query["timestamp"] = bounds[0]
+        elif bounds:
+            query["$and"] = [{"timestamp": bound} for bound in bounds]
+
+        # Newer page: walk the index forward from the cursor, then flip
+        direction = 1 if after is not None else -1
+        cursor = self._collection.find(query, READING_PROJECTION).sort("timestamp", direction).limit(limit)
+        page = list(cursor)
+        if direction == 1:
+            page.reverse()
+        return page
+
+    def iter_readings(self, device_id: Optional[int] = None,
+                      since: Optional[datetime.datetime] = None,
+                      until: Optional[datetime.datetime] = None,
+                      batch_size: int = 1000) -> Iterable[Dict[str, Any]]:
+        """
+        Stream readings oldest first straight from the server cursor
+
+        Documents are fetched batch_size at a time and never collected into
+        a list, so memory stays flat however many readings match.
+
+        Args:
+            device_id: Only this device (default: all devices)
+            since: Only readings at or after this timestamp
+            until: Only readings before this timestamp
+            batch_size: Documents per server round trip
+
+        Yields:
+            Reading documents without _id
+        """
+        self._connect()
+        query: Dict[str, Any] = {}
+        if device_id is not None:
+            query["device_id"] = device_id
+        bounds: Dict[str, Any] = {}
+        if since is not None:
+            bounds["$gte"] = since
+        if until is not None:
+            bounds["$lt"] = until
+        if bounds:
+            query["timestamp"] = bounds
+
+        sort = [("timestamp", 1)] if device_id is not None else [("timestamp", 1), ("device_id", 1)]
+        projection = dict(READING_PROJECTION, _id=0)
+        cursor = self._collection.find(query, projection).sort(sort).batch_size(batch_size)
+        try:
+            yield from cursor
+        finally:
+            cursor.close()
+
+    def iter_history(self, device_id: Optional[int] = None,
+                     since: Optional[datetime.datetime] = None,
+                     until: Optional[datetime.datetime] = None,
+                     batch_size: int = 1000) -> Iterable[Dict[str, Any]]:
+        """
+        Stream readings oldest first across the Parquet archive and MongoDB
+
+        Days before the archive watermark are read from the archive, the
+        rest with iter_readings(), so a long range spans both without gaps
+        or duplicates. Same arguments and order as iter_readings().
+        """
+        since, until = naive_utc(since), naive_utc(until)
+        archive = get_reading_archive()
+        watermark = archive.watermark()
+        if watermark is not None and (since is None or since < watermark):
+            archive_until = watermark if until is None else min(until, watermark)
+            yield from archive.iter_readings(device_id, since, archive_until)
+            since = watermark
+        if until is None or since is None or since < until:
+            yield from self.iter_readings(device_id, since, until, batch_size)
+
+    def oldest_timestamp(self) -> Optional[datetime.datetime]:
+        """Timestamp of the oldest stored reading"""
+        self._connect()
+        doc = self._collection.find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        return doc["timestamp"] if doc else None
+
+    def device_ids_between(self, since: datetime.datetime, until: datetime.datetime) -> List[Any]:
+        """Devices with readings in [since, until), numeric ids first"""
+        self._connect()
+        device_ids = self._collection.distinct("device_id", {"timestamp": {"$gte": since, "$lt": until}})
+        return sorted((device_id for device_id in device_ids if device_id is not None), key=device_order_key)
+
+    def delete_readings(self, device_id: int, since: datetime.datetime, until: datetime.datetime,
+                        inserted_before: datetime.datetime) -> int:
+        """
+        Delete a device's readings in [since, until) that were inserted before a time
+
+        The insert time is read from the ObjectId, so readings that arrive
+        while e.g. a day is being archived are left alone. The reading
+        counters are decremented by the number deleted.
+
+        Returns:
+            Number of readings deleted
+        """
+        self._connect()
+        res = self._collection.delete_many({
+            "device_id": device_id,
+            "timestamp": {"$gte": since, "$lt": until},
+            "_id": {"$lt": ObjectId.from_datetime(inserted_before)},
+        })
+        self._count_readings({device_id: -res.deleted_count})
+        return res.deleted_count
+
+    def delete_rollups(self, level: Bucket, before: datetime.datetime) -> int:
+        """
+        Delete a rollup level's buckets starting before a time
+
+        Returns:
+            Number of rollup documents deleted
+        """
+        self._connect()
+        return self._rollup(level).delete_many({"bucket": {"$lt": before}}).deleted_count
+
+    def update_rollups(self, readings: Iterable[Reading]) -> int:
+        """
+        Fold readings into the minute/hour/day rollups
+
+        Readings are combined per (device, bucket) in memory first, so each
+        level costs one unordered bulk_write of $inc/$min/$max upserts per
+        call however many readings share a bucket. Only pass readings that
+        were actually inserted - duplicates would be counted twice.
+
+        Returns:
+            Number of rollup documents created or changed
+        Raises:
+            PyMongoError if a bulk write fails
+        """
+        readings = list(readings)
+        if not self.rollups_enabled or not readings:
+            return 0
+        self._connect()
+        if not self._rollup_start_marked:
+            # The first folded minute may miss readings stored before rollups
+            # were enabled, so the watermark starts at the next minute
+            first = min(reading.timestamp for reading in readings)
+            self._rollup_meta().update_one(
+                {"_id": ROLLUP_START_ID},
+                {"$setOnInsert": {"start": naive_utc(ROLLUP_LEVELS[0].ceil(first))}},
+                upsert=True,
+            )
+            self._rollup_start_marked = True
+            self._rollup_start = None
+        touched = 0
+        for level in ROLLUP_LEVELS:
+            updates: Dict[Tuple[int, datetime.datetime], Dict[str, Dict[str, Any]]] = {}
+            for reading in readings:
+                key = (reading.device_id, level.floor(reading.timestamp).replace(tzinfo=None))
+                update = updates.get(key)
+                if update is None:
+                    update = updates[key] = {"$inc": {"count": 0}, "$min": {}, "$max": {}}
+                update["$inc"]["count"] += 1
+                for name in DOWNSAMPLE_FIELDS:
+                    value = getattr(reading, name)
+                    if not _is_number(value):
+                        continue
+                    inc, low, high = update["$inc"], update["$min"], update["$max"]
+                    inc[f"{name}_sum"] = inc.get(f"{name}_sum", 0) + value
+                    inc[f"{name}_count"] = inc.get(f"{name}_count", 0) + 1
+                    low[f"{name}_min"] = min(low.get(f"{name}_min", value), value)
+                    high[f"{name}_max"] = max(high.get(f"{name}_max", value), value)
+
+            # Concurrent upserts of a new bucket are retried by the server on
+            # the unique (device_id, bucket) index, so no bucket is split
+            operations = [
+                UpdateOne(
+                    {"device_id": device_id, "bucket": bucket},
+                    {operator: fields for operator, fields in update.items() if fields},
+                    upsert=True,
+                )
+                for (device_id, bucket), update in updates.items()
+            ]
+            res = self._rollup(level).bulk_write(operations, ordered=False)
+            touched += res.upserted_count + res.modified_count
+        return touched
+
+    def rebuild_rollups(self, since: datetime.datetime, until: datetime.datetime,
+                        device_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Recompute the rollups of [since, until) from raw readings
+
+        Minutes are grouped from raw readings, hours from minutes and days
+        from hours, each written with $merge (replacing existing documents),
+        so it is safe to re-run. Use it to backfill history recorded before
+        rollups were enabled, not on buckets that are still receiving readings.
+        A rebuild of all devices that reaches the rollup watermark moves it
+        back to since, so rebuild the newest days first.
+
+        Args:
+            since / until: Day boundaries (UTC)
+            device_ids: Only these devices (default: all devices)
+
+        Raises:
+            ValueError if since/until are not day boundaries
+        """
+        day = ROLLUP_LEVELS[-1]
+        if day.floor(since) != since or day.floor(until) != until:
+            raise ValueError("since/until must be day boundaries (UTC midnight)")
+        self._connect()
+        if device_ids is not None:
+            device_ids = list(device_ids)
+        fields = ["count"] + [f"{name}_{stat}" for name in DOWNSAMPLE_FIELDS
+                              for stat in ("min", "max", "sum", "count")]
+        source, date_field, from_rollup = self._collection, "timestamp", False
+        for level in ROLLUP_LEVELS:
+            match: Dict[str, Any] = {date_field: {"$gte": since, "$lt": until}}
+            if device_ids is not None:
+                match["device_id"] = {"$in": device_ids}
+            target = self._rollup(level)
+            pipeline = [
+                {"$match": match},
+                {"$group": _bucket_group(level, f"${date_field}", from_rollup)},
+                {"$project": dict({"_id": 0, "device_id": "$_id.device_id", "bucket": "$_id.bucket"},
+                                  **{name: 1 for name in fields})},
+                {"$merge": {"into": target.name, "on": ["device_id", "bucket"],
+                            "whenMatched": "replace", "whenNotMatched": "insert"}},
+            ]
+            source.aggregate(pipeline, allowDiskUse=True)
+            source, date_field, from_rollup = target, "bucket", True
+        if device_ids is None:
+            self._rollup_meta().update_one(
+                {"_id": ROLLUP_START_ID, "start": {"$lte": naive_utc(until)}},
+                {"$min": {"start": naive_utc(since)}},
+            )
+            self._rollup_start = None
+
+    def rollup_start(self) -> Optional[datetime.datetime]:
+        """
+        Rollup watermark: buckets from here on hold every inserted reading
+
+        Set by the first update_rollups() and moved back by rebuild_rollups();
+        cached per process for ROLLUP_START_CACHE_SECONDS.
+
+        Returns:
+            Naive UTC datetime, or None if no rollup was written yet
+        """
+        cached = self._rollup_start
+        if cached is not None and time.monotonic() - cached[1] < ROLLUP_START_CACHE_SECONDS:
+            return cached[0]
+        self._connect()
+        doc = self._rollup_meta().find_one({"_id": ROLLUP_START_ID})
+        start = doc["start"] if doc else None
+        self._rollup_start = (start, time.monotonic())
+        return start
+
+    def rollup_for(self, bucket: Bucket, since: datetime.datetime,
+                   until: datetime.datetime) -> Optional[Bucket]:
+        """
+        Coarsest rollup level that answers a downsample exactly
+
+        The level must divide the bucket and since/until must be on its
+        boundaries, so each rollup document lies wholly inside one
+        requested bucket and inside the range. Ranges starting before the
+        rollup watermark (see rollup_start) read raw readings, and levels
+        already trimmed at since (READINGS_ROLLUP_RETENTION_DAYS) are skipped.
+
+        Returns:
+            A ROLLUP_LEVELS entry, or None to read raw readings
+        """
+        if not self.rollups_enabled:
+            return None
+        start = self.rollup_start()
+        if start is None or _as_utc(since) < _as_utc(start):
+            return None
+        retention = getattr(settings, "READINGS_ROLLUP_RETENTION_DAYS", {})
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for level in reversed(ROLLUP_LEVELS):
+            days = retention.get(level.label)
+            if days and _as_utc(since) < now - datetime.timedelta(days=days):
+                # Older buckets of this level have been trimmed
+                continue
+            if (bucket.seconds % level.seconds == 0
+                    and level.floor(since) == since and level.floor(until) == until):
+                return level
+        return None
+
+    def downsample(self, device_ids: Iterable[int], since: datetime.datetime,
+                   until: datetime.datetime, bucket: "Bucket", raw: bool = False,
+                   level: Optional[Bucket] = None) -> List[Dict[str, Any]]:
+        """
+        Per-device time buckets computed on the server ($dateTrunc + $group)
+
+        Served from the coarsest rollup that fits (see rollup_for), so a
+        year of daily buckets reads ~365 documents per device; otherwise
+        from the raw readings.
+
+        Args:
+            device_ids: Devices to summarize
+            since / until: Time range [since, until)
+            bucket: Bucket size
+            raw: Always aggregate raw readings
+            level: Rollup level already chosen by rollup_for (skips the lookup)
+
+        Returns:
+            One row per (device, bucket) sorted by device_id then bucket:
+            {device_id, bucket, count, <field>_min, <field>_max, <field>_sum,
+            <field>_count} for each of DOWNSAMPLE_FIELDS
+        """
+        self._connect()
+        if raw:
+            level = None
+        elif level is None:
+            level = self.rollup_for(bucket, since, until)
+        if level is None:
+            collection, date_field = self._collection, "timestamp"
+        else:
+            collection, date_field = self._rollup(level), "bucket"
+
+        pipeline = [
+            {"$match": {
+                "device_id": {"$in": list(device_ids)},
+                date_field: {"$gte": since, "$lt": until},
+            }},
+            {"$group": _bucket_group(bucket, f"${date_field}", level is not None)},
+            {"$sort": {"_id.device_id": 1, "_id.bucket": 1}},
+        ]
+        rows = []
+        for doc in collection.aggregate(pipeline, allowDiskUse=True):
+            key = doc.pop("_id")
+            doc["device_id"] = key["device_id"]
+            doc["bucket"] = key["bucket"]
+            rows.append(doc)
+        return rows
+
+    def find_feed_page(self, limit: int = 100,
+                       before: Optional[Tuple[datetime.datetime, int]] = None,
+                       after: Optional[Tuple[datetime.datetime, int]] = None,
+                       since: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Keyset page of all devices' readings in (timestamp, device_id) order
+
+        One query on the (timestamp, device_id) index, whatever the number
+        of devices.
+
+        Args:
+            limit: Page size
+            before: Only readings older than this (timestamp, device_id) cursor
+            after: Only readings newer than this (timestamp, device_id) cursor
+            since: Only readings at or after this timestamp
+
+        Returns:
+            Up to limit readings, newest first
+        """
+        self._connect()
+        conditions: List[Dict[str, Any]] = []
+        if since is not None:
+            conditions.append({"timestamp": {"$gte": since}})
+        if before is not None:
+            timestamp, device_id = before
+            conditions.append({"$or": [
+                {"timestamp": {"$lt": timestamp}},
+                {"timestamp": timestamp, "device_id": {"$lt": device_id}},
+            ]})
+        if after is not None:
+            timestamp, device_id = after
+            conditions.append({"$or": [
+                {"timestamp": {"$gt": timestamp}},
+                {"timestamp": timestamp, "device_id": {"$gt": device_id}},
+            ]})
+        query = {"$and": conditions} if conditions else {}
+
+        direction = 1 if after is not None else -1
+        cursor = (self._collection.find(query, READING_PROJECTION)
+                  .sort([("timestamp", direction), ("device_id", direction)])
+                  .limit(limit))
+        page = list(cursor)
+        if direction == 1:
+            page.reverse()
+        return page
+
+    def find_feed_per_device(self, device_ids: Iterable[int], limit_per_device: int,
+                             before: Optional[Tuple[datetime.datetime, int]] = None,
+                             since: Optional[datetime.datetime] = None,
+                             max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Newest readings of every device, at most limit_per_device each
+
+        Per-device queries run in parallel on a bounded thread pool (pymongo
+        clients are thread-safe and share the connection pool).
+
+        Returns:
+            Readings of all devices, newest first in (timestamp, device_id) order
+        """
+        if max_workers is None:
+            max_workers = getattr(settings, "READINGS_FANOUT_WORKERS", 8)
+
+        def fetch(device_id: int) -> List[Dict[str, Any]]:
+            kwargs: Dict[str, Any] = {}
+            if before is not None:
+                kwargs["before"] = before[0]
+                kwargs["inclusive"] = device_id < before[1]
+            return self.find_readings_page(device_id, limit=limit_per_device, since=since, **kwargs)
+
+        readings: List[Dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for device_readings in executor.map(fetch, device_ids):
+                readings.extend(device_readings)
+        readings.sort(key=lambda reading: (reading["timestamp"], reading["device_id"]), reverse=True)
+        return readings
@@ -14,7 +14,10 @@ from .base import (
     UserSerializer,
     DeviceSerializer,
     ReadingSerializer,
-    LatestReadingSerializer
+    LatestReadingSerializer,
+    serialize_readings,
+    serialize_latest_readings,
+    datetime_formatter
 )
 
 # Building serializers
@@ -48,6 +51,9 @@ __all__ = [
     'DeviceSerializer',
     'ReadingSerializer',
     'LatestReadingSerializer',
+    'serialize_readings',
+    'serialize_latest_readings',
+    'datetime_formatter',
     
     # Building
     'BuildingSerializer',
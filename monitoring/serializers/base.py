@@ -1,8 +1,19 @@
 """
 Base IoT serializers - User, Device, Reading
+
+Readings are fixed-shape MongoDB/Redis documents served in bulk, so besides
+the DRF serializers there are fast-path functions (serialize_readings,
+serialize_latest_readings) that build the same output with one dict
+literal per row and a datetime formatter resolved once per call.
 """
 
-from rest_framework import serializers
+import datetime
+from typing import Any, Callable, Dict, Iterable, List
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from monitoring.models import User, Device
 
 
@@ -41,3 +52,86 @@ class LatestReadingSerializer(serializers.Serializer):
     humidity = serializers.FloatField()
     timestamp = serializers.DateTimeField()
     status = serializers.CharField(default='online')  # online/offline based on TTL
+
+
+_datetime_field = serializers.DateTimeField()
+
+
+def datetime_formatter() -> Callable[[Any], Any]:
+    """
+    DateTimeField.to_representation() equivalent, resolved once per call site
+
+    With the default settings (USE_TZ, UTC, ISO 8601) this is a plain
+    isoformat() + 'Z'; any other configuration defers to DRF.
+    """
+    if (settings.USE_TZ and timezone.get_default_timezone_name() == 'UTC'
+            and api_settings.DATETIME_FORMAT == ISO_8601):
+        utc = datetime.timezone.utc
+
+        def format_utc(value):
+            if value is None or isinstance(value, str):
+                return value
+            if value.tzinfo is not None:
+                value = value.astimezone(utc).replace(tzinfo=None)
+            return value.isoformat() + 'Z'
+        return format_utc
+
+    def format_drf(value):
+        if value is None or isinstance(value, str):
+            return value
+        return _datetime_field.to_representation(value)
+    return format_drf
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def _device_id(value):
+    """Payload device id from Redis: int when numeric, any other id unchanged"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+def serialize_readings(readings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fast path for ReadingSerializer(readings, many=True).data"""
+    fmt = datetime_formatter()
+    results = []
+    for reading in readings:
+        row = {
+            'device_id': _int(reading.get('device_id')),
+            'temperature': _float(reading.get('temperature')),
+            'humidity': _float(reading.get('humidity')),
+            'timestamp': fmt(reading.get('timestamp')),
+        }
+        if '_id' in reading:
+            row['id'] = None if reading['_id'] is None else str(reading['_id'])
+        results.append(row)
+    return results
+
+
+def serialize_latest_readings(readings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Fast path for LatestReadingSerializer(readings, many=True).data
+
+    Redis keeps the raw payload device_id, so non-numeric ids pass through.
+    """
+    fmt = datetime_formatter()
+    return [
+        {
+            'device_id': _device_id(reading.get('device_id')),
+            'temperature': _float(reading.get('temperature')),
+            'humidity': _float(reading.get('humidity')),
+            'timestamp': fmt(reading.get('timestamp')),
+            'status': reading.get('status', 'online'),
+        }
+        for reading in readings
+    ]
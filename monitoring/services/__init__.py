@@ -3,36 +3,132 @@ Monitoring services module
 
 Business logic layer for Smart Building operations:
 - alert_service: Threshold checking and alert creation
-- hvac_service: Automatic HVAC control
+- rule_engine: Vectorized (NumPy) zone threshold evaluation
+- hvac_service: Automatic HVAC control (debounced zone control loop)
 - camera_service: Camera recording triggers
 - cache_service: Redis caching operations
+- search_service: Shared OpenSearch client and bulk indexing
+- device_cache: In-process device id -> Device pk resolution
+- topology_service: In-memory device -> zone sensor -> zone -> HVAC index
+- presence_service: Device online/offline status (last-seen sorted set)
+- retention_service: Raw reading archiving and rollup/search index trimming
+- column_cache: Local memory-mapped per-device reading columns (NumPy)
 """
 
-from .alert_service import check_building_thresholds
-from .hvac_service import auto_control_hvac
-from .camera_service import trigger_camera_recording
+from .alert_service import (
+    check_building_thresholds,
+    check_building_thresholds_batch,
+    create_alerts,
+    get_alert_deduplicator,
+    AlertSink
+)
+from .rule_engine import (
+    ThresholdEngine,
+    get_threshold_engine,
+    get_sensor_rules
+)
+from .hvac_service import (
+    auto_control_hvac,
+    get_hvac_controller,
+    run_hvac_control_loop,
+    HVACController
+)
+from .camera_service import trigger_camera_recording, build_recording_path
 from .cache_service import (
     cache_latest_reading,
+    cache_latest_readings,
     get_latest_reading,
     get_all_latest_readings,
     clear_device_cache,
+    prune_latest_readings,
     get_redis_client
 )
+from .search_service import (
+    get_opensearch_client,
+    get_reading_indexer
+)
+from .device_cache import (
+    resolve_device_pk,
+    clear_device_resolution_cache
+)
+from .topology_service import (
+    get_topology,
+    invalidate_topology
+)
+from .presence_service import (
+    get_online_device_ids,
+    count_online_devices,
+    get_recently_offline,
+    run_presence_sweeper,
+    device_went_offline
+)
+from .retention_service import (
+    RetentionManager,
+    get_retention_manager,
+    run_retention_loop
+)
+from .column_cache import (
+    ColumnCache,
+    get_column_cache
+)
 
 __all__ = [
     # Alert service
     'check_building_thresholds',
+    'check_building_thresholds_batch',
+    'create_alerts',
+    'get_alert_deduplicator',
+    'AlertSink',
+    
+    # Rule engine
+    'ThresholdEngine',
+    'get_threshold_engine',
+    'get_sensor_rules',
     
     # HVAC service
     'auto_control_hvac',
+    'get_hvac_controller',
+    'run_hvac_control_loop',
+    'HVACController',
     
     # Camera service
     'trigger_camera_recording',
+    'build_recording_path',
     
     # Cache service
     'cache_latest_reading',
+    'cache_latest_readings',
     'get_latest_reading',
     'get_all_latest_readings',
     'clear_device_cache',
+    'prune_latest_readings',
     'get_redis_client',
+    
+    # Search service
+    'get_opensearch_client',
+    'get_reading_indexer',
+    
+    # Device cache
+    'resolve_device_pk',
+    'clear_device_resolution_cache',
+    
+    # Topology service
+    'get_topology',
+    'invalidate_topology',
+    
+    # Presence service
+    'get_online_device_ids',
+    'count_online_devices',
+    'get_recently_offline',
+    'run_presence_sweeper',
+    'device_went_offline',
+    
+    # Retention service
+    'RetentionManager',
+    'get_retention_manager',
+    'run_retention_loop',
+    
+    # Column cache
+    'ColumnCache',
+    'get_column_cache',
 ]
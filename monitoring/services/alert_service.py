@@ -1,77 +1,267 @@
 """
 Alert service - Smart Building threshold checking and alert creation
+
+Alerts are deduplicated per (zone, alert_type): the first breach opens an
+alert row, repeated breaches only bump its occurrence_count/last_seen_at,
+and the alert is resolved once every breaching sensor is back inside the
+hysteresis band (see rule_engine). An open alert is re-notified (severity
+escalated, acknowledgement kept) at most every ALERT_RENOTIFY_INTERVAL
+seconds or immediately when its severity worsens.
 """
 
+import datetime
 import logging
-from typing import List
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
 from monitoring.models import BuildingAlert, ZoneSensor
+from .camera_service import build_recording_path
+from .rule_engine import Breach, ThresholdEngine, SEVERITIES, get_sensor_rules, get_threshold_engine
+from .topology_service import get_topology
 
 logger = logging.getLogger(__name__)
 
+_SEVERITY_RANK = {name: index for index, name in enumerate(SEVERITIES)}
+
+
+@dataclass
+class OpenAlert:
+    """In-memory state of an open (unresolved) alert"""
+    severity: str
+    last_notified_at: datetime.datetime
+    sensors: Set[int] = field(default_factory=set)  # ZoneSensor pks still breaching
+
+
+class AlertDeduplicator:
+    """Open-alert state per (zone_id, alert_type), loaded from MySQL on first use"""
+
+    def __init__(self):
+        self._open: Optional[Dict[Tuple[int, str], OpenAlert]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[Tuple[int, str], OpenAlert]:
+        """
+        Open alerts from MySQL
+
+        Which sensors were breaching is not stored, so every active zone
+        sensor whose rule raises the alert type counts as breaching until it
+        reports a clear reading.
+        """
+        if self._open is None:
+            self._open = {}
+            topology = get_topology()
+            rules = get_sensor_rules()
+            rows = BuildingAlert.objects.filter(resolved_at__isnull=True).values(
+                'zone_id', 'alert_type', 'severity', 'last_notified_at', 'created_at'
+            )
+            for row in rows:
+                sensors = {
+                    sensor.pk for sensor in topology.by_zone.get(row['zone_id'], ())
+                    if rules.get(sensor.sensor_type, {}).get('alert_type') == row['alert_type']
+                }
+                self._open[(row['zone_id'], row['alert_type'])] = OpenAlert(
+                    severity=row['severity'],
+                    last_notified_at=row['last_notified_at'] or row['created_at'],
+                    sensors=sensors,
+                )
+        return self._open
+
+    def reset(self) -> None:
+        """Forget the in-memory state (reloaded from MySQL on next use)"""
+        with self._lock:
+            self._open = None
+
+    def process(self, breaches: List[Breach], clears: List[Tuple[ZoneSensor, str]]) -> List[Breach]:
+        """
+        Fold a batch of breaches/clears into the open-alert state
+
+        Updates open alert rows in place (one UPDATE per open alert per batch)
+        and resolves cleared ones. An open alert whose row is gone (deleted
+        or resolved through the API/admin) is opened again.
+
+        Returns:
+            Breaches that open a new alert (one per key, with occurrences set)
+        """
+        now = timezone.now()
+        renotify_interval = datetime.timedelta(
+            seconds=getattr(settings, 'ALERT_RENOTIFY_INTERVAL', 900)
+        )
+
+        grouped: Dict[Tuple[int, str], List[Breach]] = {}
+        for breach in breaches:
+            grouped.setdefault((breach.zone_sensor.zone_id, breach.alert_type), []).append(breach)
+
+        new_alerts = []
+        with self._lock:
+            state = self._load()
+
+            for key, group in grouped.items():
+                worst = max(group, key=lambda b: _SEVERITY_RANK[b.severity])
+                latest = group[-1]
+                sensors = {b.zone_sensor.pk for b in group}
+                current = state.get(key)
+
+                if current is None:
+                    worst.occurrences = len(group)
+                    new_alerts.append(worst)
+                    state[key] = OpenAlert(worst.severity, now, sensors)
+                    continue
+
+                current.sensors |= sensors
+                updates = {
+                    'occurrence_count': F('occurrence_count') + len(group),
+                    'last_seen_at': now,
+                    'sensor_value': latest.value,
+                    'message': latest.message,
+                }
+                escalated = _SEVERITY_RANK[worst.severity] > _SEVERITY_RANK[current.severity]
+                renotify = escalated or now - current.last_notified_at >= renotify_interval
+                if renotify:
+                    updates.update(
+                        severity=worst.severity if escalated else current.severity,
+                        last_notified_at=now,
+                    )
+
+                updated = BuildingAlert.objects.filter(
+                    zone_id=key[0], alert_type=key[1], resolved_at__isnull=True
+                ).update(**updates)
+                if not updated:
+                    # Deleted or resolved outside ingest (API/admin): open a new alert
+                    worst.occurrences = len(group)
+                    new_alerts.append(worst)
+                    state[key] = OpenAlert(worst.severity, now, sensors)
+                    continue
+
+                if renotify:
+                    current.severity = updates['severity']
+                    current.last_notified_at = now
+                    logger.warning("⚠️  ALERT (re-notify): %s - %s", worst.title, latest.message)
+
+            resolved = set()
+            for zone_sensor, alert_type in clears:
+                key = (zone_sensor.zone_id, alert_type)
+                current = state.get(key)
+                if current is None or key in grouped:
+                    continue
+                current.sensors.discard(zone_sensor.pk)
+                if not current.sensors:
+                    resolved.add(key)
+
+            for key in resolved:
+                del state[key]
+                BuildingAlert.objects.filter(
+                    zone_id=key[0], alert_type=key[1], resolved_at__isnull=True
+                ).update(resolved_at=now)
+                logger.info("✓ Alert resolved: zone=%s, type=%s", key[0], key[1])
+
+        return new_alerts
+
+
+_deduplicator = AlertDeduplicator()
+
+
+def get_alert_deduplicator() -> AlertDeduplicator:
+    """Get the process-wide alert deduplicator"""
+    return _deduplicator
+
+
+class AlertSink:
+    """
+    Accumulates new alerts of a batch and writes them with one bulk_create
+
+    The zone's active camera comes from the cached topology and the camera /
+    video_recording_path are set before insert, so each alert costs no query.
+    """
+
+    def __init__(self):
+        self._pending: List[BuildingAlert] = []
+
+    def add(self, breach: Breach) -> BuildingAlert:
+        """Queue a (not yet saved) alert for a breach"""
+        now = timezone.now()
+        alert = BuildingAlert(
+            zone=breach.zone,
+            alert_type=breach.alert_type,
+            severity=breach.severity,
+            title=breach.title,
+            message=breach.message,
+            sensor_value=breach.value,
+            sensor_type=breach.zone_sensor.sensor_type,
+            occurrence_count=breach.occurrences,
+            last_seen_at=now,
+            last_notified_at=now,
+        )
+
+        # Camera recording
+        camera = get_topology().camera_for_zone(breach.zone_sensor.zone_id)
+        if camera is not None:
+            alert.camera = camera
+            alert.video_recording_path = build_recording_path(camera, breach.alert_type, now)
+            logger.info("Camera recording marked: %s -> %s", camera.name, alert.video_recording_path)
+
+        self._pending.append(alert)
+        logger.warning("⚠️  ALERT: %s - %s", breach.title, breach.message)
+        return alert
+
+    def flush(self) -> List[BuildingAlert]:
+        """Insert all queued alerts in one query"""
+        pending, self._pending = self._pending, []
+        if pending:
+            BuildingAlert.objects.bulk_create(pending)
+        return pending
+
+
+def create_alerts(breaches: List[Breach]) -> List[BuildingAlert]:
+    """
+    Create a BuildingAlert per breach (with camera recording) in one query
+
+    Args:
+        breaches: Breaches that open a new alert
+
+    Returns:
+        Created alerts
+    """
+    sink = AlertSink()
+    for breach in breaches:
+        sink.add(breach)
+    return sink.flush()
+
+
+def _raise_alerts(engine: ThresholdEngine, readings: Sequence[Tuple[int, Dict[str, Any], Any]]) -> int:
+    breaches, clears = engine.evaluate_batch(readings)
+    new_breaches = get_alert_deduplicator().process(breaches, clears)
+    return len(create_alerts(new_breaches))
+
+
+def check_building_thresholds_batch(readings: Sequence[Tuple[int, Dict[str, Any], Any]]) -> int:
+    """
+    Check a micro-batch of readings against zone thresholds and create alerts
+
+    Args:
+        readings: (device pk, payload data, timestamp) tuples
+
+    Returns:
+        Number of new alerts created (repeated breaches update open alerts)
+    """
+    return _raise_alerts(get_threshold_engine(), readings)
+
 
 def check_building_thresholds(zone_sensor: ZoneSensor, temperature: float = None, humidity: float = None) -> int:
     """
     Check if sensor values exceed zone thresholds and create alerts
-    
+
     Args:
         zone_sensor: The ZoneSensor instance
         temperature: Current temperature reading (optional)
         humidity: Current humidity reading (optional)
-        
+
     Returns:
-        Number of alerts created
+        Number of new alerts created (repeated breaches update open alerts)
     """
-    zone = zone_sensor.zone
-    alerts_created = []
-    
-    # Check temperature thresholds
-    if zone_sensor.sensor_type == 'TEMPERATURE' and temperature is not None:
-        if temperature < zone.temp_min:
-            alert = BuildingAlert.objects.create(
-                zone=zone,
-                alert_type='TEMPERATURE',
-                severity='WARNING',
-                title=f'Temperature Too Low',
-                message=f'{zone.name}: {temperature}°C (Min: {zone.temp_min}°C)',
-                sensor_value=temperature,
-                sensor_type='TEMPERATURE'
-            )
-            alerts_created.append(alert)
-            logger.warning("⚠️  ALERT: Temperature too low in %s: %s°C", zone.name, temperature)
-            
-        elif temperature > zone.temp_max:
-            severity = 'CRITICAL' if temperature > zone.temp_max + 3 else 'WARNING'
-            alert = BuildingAlert.objects.create(
-                zone=zone,
-                alert_type='TEMPERATURE',
-                severity=severity,
-                title=f'Temperature Too High',
-                message=f'{zone.name}: {temperature}°C (Max: {zone.temp_max}°C)',
-                sensor_value=temperature,
-                sensor_type='TEMPERATURE'
-            )
-            alerts_created.append(alert)
-            logger.warning("⚠️  ALERT: Temperature too high in %s: %s°C", zone.name, temperature)
-    
-    # Check humidity thresholds
-    if zone_sensor.sensor_type == 'HUMIDITY' and humidity is not None:
-        if humidity < zone.humidity_min or humidity > zone.humidity_max:
-            alert = BuildingAlert.objects.create(
-                zone=zone,
-                alert_type='HUMIDITY',
-                severity='WARNING',
-                title=f'Humidity Out of Range',
-                message=f'{zone.name}: {humidity}% (Range: {zone.humidity_min}-{zone.humidity_max}%)',
-                sensor_value=humidity,
-                sensor_type='HUMIDITY'
-            )
-            alerts_created.append(alert)
-            logger.warning("⚠️  ALERT: Humidity out of range in %s: %s%%", zone.name, humidity)
-    
-    # Start camera recording if alerts created
-    if alerts_created:
-        from .camera_service import trigger_camera_recording
-        for alert in alerts_created:
-            trigger_camera_recording(zone, alert)
-    
-    return len(alerts_created)
+    data = {'temperature': temperature, 'humidity': humidity}
+    return _raise_alerts(ThresholdEngine([zone_sensor]), [(zone_sensor.device_id, data, timezone.now())])
@@ -1,106 +1,412 @@
 """
 Cache service - Redis operations for sensor data caching
+
+Layout (one key each for the whole fleet):
+- latest:readings   Hash  device_id -> latest reading (JSON)
+- latest:last_seen  ZSet  device_id -> last seen (unix time)
+
+A device is online while it was seen within DEVICE_ONLINE_WINDOW seconds
+(see presence_service for online/offline queries). Writes are pipelined per
+ingest batch; reading one device or the whole fleet is a single round trip.
+Devices not seen for LATEST_READINGS_RETENTION seconds are pruned from both
+keys by prune_latest_readings() (run by the presence sweeper).
+
+Reads are fronted by a per-process L1 cache (TTL + LRU). Every write
+publishes the written device ids on latest:invalidate and each process drops
+the matching L1 entries as soon as the message arrives; the L1 is only used
+while that subscription is up, so API workers never serve data that Redis
+has already replaced. Online/offline status is computed at read time from
+the cached last-seen time, so it is never stale either.
+
+All Redis calls go through a pooled client with short timeouts and a
+circuit breaker: while Redis is down the cache degrades to pass-through
+(writes skipped, reads miss) without blocking ingest.
 """
 
 import json
 import logging
+import os
+import threading
+import time
+import warnings
 import redis
-from typing import Optional, Dict, Any, List
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+from typing import Optional, Dict, Any, Hashable, List, Tuple
 from django.conf import settings
 
+from .device_cache import LRUCache
+
 logger = logging.getLogger(__name__)
 
+LATEST_READINGS_KEY = "latest:readings"
+LAST_SEEN_KEY = "latest:last_seen"
+INVALIDATION_CHANNEL = "latest:invalidate"
+
+# Removes up to ARGV[2] devices last seen at or before ARGV[1] from both keys
+# atomically, so a device written meanwhile keeps its reading
+PRUNE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+if #stale > 0 then
+    redis.call('HDEL', KEYS[1], unpack(stale))
+    redis.call('ZREM', KEYS[2], unpack(stale))
+end
+return stale
+"""
+PRUNE_BATCH_SIZE = 1000
+
 # Redis client singleton
 _redis_client = None
 
 
 def get_redis_client() -> redis.Redis:
-    """Get or create Redis client"""
+    """
+    Get or create the shared Redis client
+
+    Connections come from a BlockingConnectionPool on REDIS_URL with short
+    socket/connect timeouts, periodic health checks and a bounded retry with
+    exponential backoff, so a stalled Redis fails a call in well under a
+    second instead of blocking on the OS TCP timeout.
+    """
     global _redis_client
     if _redis_client is None:
-        redis_host = getattr(settings, 'REDIS_HOST', 'iot-redis')
-        redis_port = getattr(settings, 'REDIS_PORT', 6379)
-        _redis_client = redis.Redis(
-            host=redis_host,
-            port=redis_port,
-            db=0,
-            decode_responses=True
+        redis_url = getattr(settings, 'REDIS_URL', None) or "redis://{}:{}/0".format(
+            getattr(settings, 'REDIS_HOST', 'iot-redis'),
+            getattr(settings, 'REDIS_PORT', 6379),
+        )
+        retry = Retry(
+            ExponentialBackoff(cap=0.1, base=0.01),
+            getattr(settings, 'REDIS_RETRIES', 1),
         )
+        pool = redis.BlockingConnectionPool.from_url(
+            redis_url,
+            max_connections=getattr(settings, 'REDIS_MAX_CONNECTIONS', 50),
+            timeout=getattr(settings, 'REDIS_POOL_TIMEOUT', 0.2),
+            socket_timeout=getattr(settings, 'REDIS_SOCKET_TIMEOUT', 0.5),
+            socket_connect_timeout=getattr(settings, 'REDIS_CONNECT_TIMEOUT', 0.5),
+            health_check_interval=getattr(settings, 'REDIS_HEALTH_CHECK_INTERVAL', 30),
+            retry=retry,
+            retry_on_error=[redis.ConnectionError, redis.TimeoutError],
+            decode_responses=True,
+        )
+        _redis_client = redis.Redis(connection_pool=pool)
     return _redis_client
 
 
-def cache_latest_reading(device_id: int, data: Dict[str, Any], ttl: int = 60) -> bool:
+class CircuitBreaker:
+    """
+    Fail fast while Redis is down
+
+    After failure_threshold consecutive Redis errors the circuit opens and
+    calls are skipped (cache pass-through) for reset_timeout seconds; then a
+    single trial call is let through and closes the circuit on success.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """True if a Redis call may be attempted now"""
+        if self._opened_at is None:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = True  # Half-open: one trial call
+                return True
+            return False
+
+    def success(self) -> None:
+        if self._failures or self._opened_at is not None:
+            with self._lock:
+                if self._opened_at is not None:
+                    logger.info("✓ Redis circuit closed")
+                self._failures = 0
+                self._opened_at = None
+                self._trial = False
+
+    def failure(self, error: Exception) -> None:
+        """Record a failed call; only Redis errors count"""
+        if not isinstance(error, redis.RedisError):
+            return
+        with self._lock:
+            self._failures += 1
+            if self._trial or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    logger.warning("Redis circuit opened after %d failure(s): %s", self._failures, error)
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+redis_breaker = CircuitBreaker(
+    failure_threshold=getattr(settings, 'REDIS_CIRCUIT_FAILURE_THRESHOLD', 5),
+    reset_timeout=getattr(settings, 'REDIS_CIRCUIT_RESET_TIMEOUT', 10.0),
+)
+
+
+class L1Cache:
+    """
+    Per-process TTL + LRU cache of Redis reads, invalidated over pub/sub
+
+    Entries are only stored and served while the invalidation listener is
+    subscribed. A read that raced with an invalidation is not stored
+    (generation check), so a stale value can never outlive its invalidation.
+
+    The all-devices entry (ALL) changes with every ingest batch, so it is
+    not invalidated: it is stored without the generation check and expires
+    after L1_CACHE_ALL_TTL (about a second) instead.
+    """
+
+    ALL = ('all',)
+
+    def __init__(self):
+        self._entries = LRUCache(getattr(settings, 'L1_CACHE_SIZE', 10000))
+        self._listening = False
+        self._listener_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    @staticmethod
+    def device_key(device_id: Any) -> Tuple[str, str]:
+        return ('device', str(device_id))
+
+    def _ensure_listener(self) -> bool:
+        """Start the invalidation listener once per process; True if it is up"""
+        if not getattr(settings, 'L1_CACHE_ENABLED', True):
+            return False
+        if self._listener_pid != os.getpid():
+            with self._lock:
+                if self._listener_pid != os.getpid():
+                    self._listening = False
+                    self._entries.clear()
+                    self._listener_pid = os.getpid()
+                    threading.Thread(target=self._listen, name='l1-invalidation', daemon=True).start()
+        return self._listening
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value, or None on miss/expiry or when the listener is down"""
+        if not self._ensure_listener():
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None,
+            ttl: Optional[float] = None) -> None:
+        """
+        Store a value read from Redis
+
+        Args:
+            generation: self.generation before the read; the value is dropped
+                if an invalidation arrived since (None: TTL only, no check)
+            ttl: Seconds to keep the value (default L1_CACHE_TTL)
+        """
+        if self._listening and generation in (None, self.generation):
+            if ttl is None:
+                ttl = getattr(settings, 'L1_CACHE_TTL', 5.0)
+            self._entries.put(key, (time.monotonic() + ttl, value))
+
+    def invalidate(self, device_ids: List[str]) -> None:
+        self.generation += 1
+        for device_id in device_ids:
+            self._entries.pop(self.device_key(device_id))
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+
+    def _listen(self) -> None:
+        """Invalidation listener loop (runs in a daemon thread)"""
+        pid = os.getpid()
+        while self._listener_pid == pid:
+            pubsub = None
+            try:
+                pubsub = get_redis_client().pubsub()
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                while self._listener_pid == pid:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message['type'] == 'subscribe':
+                        self._listening = True
+                        logger.debug("L1 cache invalidation listener subscribed")
+                    elif message['type'] == 'message':
+                        self.invalidate(message['data'].split(','))
+            except Exception as e:
+                logger.warning("L1 cache invalidation listener failed: %s", e)
+            finally:
+                # Missed messages can't be replayed: drop everything
+                self._listening = False
+                self.clear()
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            time.sleep(1.0)
+
+
+_l1 = L1Cache()
+
+
+def _online_since() -> float:
+    """Oldest last-seen time that still counts as online"""
+    return time.time() - getattr(settings, 'DEVICE_ONLINE_WINDOW', 60)
+
+
+def _with_status(data: Dict[str, Any], last_seen: Optional[float], online_since: float) -> Dict[str, Any]:
+    status = 'online' if last_seen is not None and last_seen >= online_since else 'offline'
+    return dict(data, status=status)
+
+
+def _warn_ttl_deprecated() -> None:
+    warnings.warn(
+        "ttl is ignored: latest readings no longer expire, stale devices are "
+        "pruned after LATEST_READINGS_RETENTION",
+        DeprecationWarning, stacklevel=3,
+    )
+
+
+def cache_latest_reading(device_id: int, data: Dict[str, Any], ttl: Optional[int] = None) -> bool:
     """
     Cache latest sensor reading to Redis
-    
+
     Args:
         device_id: Device ID
         data: Sensor reading data (dict)
-        ttl: Time to live in seconds (default: 60)
-        
+        ttl: Deprecated, ignored
+
     Returns:
         True if cached successfully, False otherwise
     """
+    if ttl is not None:
+        _warn_ttl_deprecated()
+    return cache_latest_readings([(device_id, data)]) == 1
+
+
+def cache_latest_readings(items: List[Tuple[Any, Dict[str, Any]]], ttl: Optional[int] = None) -> int:
+    """
+    Cache a batch of latest sensor readings to Redis in one round trip
+
+    Only the last reading per device in the batch is written; every device
+    of the batch is marked as seen now and invalidated in all L1 caches.
+
+    Args:
+        items: List of (device_id, data) tuples, in arrival order
+        ttl: Deprecated, ignored
+
+    Returns:
+        Number of devices written (0 on failure)
+    """
+    if ttl is not None:
+        _warn_ttl_deprecated()
+    if not items:
+        return 0
+
+    latest: Dict[str, str] = {}
+    for device_id, data in items:
+        latest[str(device_id)] = json.dumps(data)
+
+    if not redis_breaker.allow():
+        return 0
     try:
-        client = get_redis_client()
-        cache_key = f"latest:device{device_id}"
-        cache_value = json.dumps(data)
-        client.set(cache_key, cache_value, ex=ttl)
-        logger.info("✓ Cached to Redis: %s", cache_key)
-        return True
+        now = time.time()
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.hset(LATEST_READINGS_KEY, mapping=latest)
+        pipe.zadd(LAST_SEEN_KEY, {device_id: now for device_id in latest})
+        pipe.publish(INVALIDATION_CHANNEL, ','.join(latest))
+        pipe.execute()
+        redis_breaker.success()
+        logger.debug("✓ Cached %d device(s) to Redis", len(latest))
+        return len(latest)
     except Exception as e:
-        logger.warning("Failed to cache to Redis: %s", e)
-        return False
+        redis_breaker.failure(e)
+        logger.warning("Failed to batch cache to Redis: %s", e)
+        return 0
 
 
 def get_latest_reading(device_id: int) -> Optional[Dict[str, Any]]:
     """
-    Get latest reading from Redis cache
-    
+    Get latest reading from the L1 cache or Redis
+
     Args:
         device_id: Device ID
-        
+
     Returns:
-        Sensor reading data dict or None if not found
+        Sensor reading data dict (with 'status' online/offline) or None if
+        the device never reported
     """
     try:
-        client = get_redis_client()
-        cache_key = f"latest:device{device_id}"
-        cached_data = client.get(cache_key)
-        
-        if cached_data:
-            data = json.loads(cached_data)
-            ttl = client.ttl(cache_key)
-            data['status'] = 'online' if ttl > 0 else 'offline'
-            return data
+        key = L1Cache.device_key(device_id)
+        entry = _l1.get(key)
+        if entry is None:
+            if not redis_breaker.allow():
+                return None
+            generation = _l1.generation
+            pipe = get_redis_client().pipeline(transaction=False)
+            pipe.hget(LATEST_READINGS_KEY, str(device_id))
+            pipe.zscore(LAST_SEEN_KEY, str(device_id))
+            cached_data, last_seen = pipe.execute()
+            redis_breaker.success()
+            entry = (json.loads(cached_data) if cached_data else None, last_seen)
+            _l1.put(key, entry, generation)
+
+        data, last_seen = entry
+        if data is not None:
+            return _with_status(data, last_seen, _online_since())
         return None
     except Exception as e:
+        redis_breaker.failure(e)
         logger.error("Failed to get from Redis: %s", e)
         return None
 
 
+def _device_sort_key(device_id: Any) -> Tuple[int, int, str]:
+    """Numeric device ids first, in numeric order (int or str), then the rest as text"""
+    try:
+        return (0, int(device_id), '')
+    except (TypeError, ValueError):
+        return (1, 0, str(device_id))
+
+
 def get_all_latest_readings() -> List[Dict[str, Any]]:
     """
-    Get all latest readings from Redis cache
-    
+    Get all latest readings from the L1 cache or Redis (one round trip)
+
     Returns:
-        List of sensor reading dicts
+        List of sensor reading dicts with 'status' online/offline, by device_id
     """
     try:
-        client = get_redis_client()
-        results = []
-        
-        for key in client.scan_iter("latest:device*"):
-            cached_data = client.get(key)
-            if cached_data:
-                data = json.loads(cached_data)
-                ttl = client.ttl(key)
-                data['status'] = 'online' if ttl > 0 else 'offline'
-                results.append(data)
-        
-        results.sort(key=lambda x: x.get('device_id', 0))
-        return results
+        entries = _l1.get(L1Cache.ALL)
+        if entries is None:
+            if not redis_breaker.allow():
+                return []
+            pipe = get_redis_client().pipeline(transaction=False)
+            pipe.hgetall(LATEST_READINGS_KEY)
+            pipe.zrange(LAST_SEEN_KEY, 0, -1, withscores=True)
+            cached, last_seen = pipe.execute()
+            redis_breaker.success()
+
+            seen = dict(last_seen)
+            entries = [(json.loads(raw), seen.get(device_id)) for device_id, raw in cached.items()]
+            entries.sort(key=lambda entry: _device_sort_key(entry[0].get('device_id')))
+            _l1.put(L1Cache.ALL, entries, ttl=getattr(settings, 'L1_CACHE_ALL_TTL', 1.0))
+
+        online_since = _online_since()
+        return [_with_status(data, last_seen, online_since) for data, last_seen in entries]
     except Exception as e:
+        redis_breaker.failure(e)
         logger.error("Failed to get all from Redis: %s", e)
         return []
 
@@ -108,19 +414,61 @@ def get_all_latest_readings() -> List[Dict[str, Any]]:
 def clear_device_cache(device_id: int) -> bool:
     """
     Clear cached data for a device
-    
+
     Args:
         device_id: Device ID
-        
+
     Returns:
         True if cleared successfully, False otherwise
     """
+    if not redis_breaker.allow():
+        return False
     try:
-        client = get_redis_client()
-        cache_key = f"latest:device{device_id}"
-        client.delete(cache_key)
-        logger.info("✓ Cleared Redis cache: %s", cache_key)
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.hdel(LATEST_READINGS_KEY, str(device_id))
+        pipe.zrem(LAST_SEEN_KEY, str(device_id))
+        pipe.publish(INVALIDATION_CHANNEL, str(device_id))
+        pipe.execute()
+        redis_breaker.success()
+        logger.debug("✓ Cleared Redis cache: device %s", device_id)
         return True
     except Exception as e:
+        redis_breaker.failure(e)
         logger.error("Failed to clear Redis cache: %s", e)
         return False
+
+
+def prune_latest_readings(retention: Optional[float] = None) -> int:
+    """
+    Drop devices not seen for longer than the retention window
+
+    Args:
+        retention: Seconds since last seen (default: LATEST_READINGS_RETENTION)
+
+    Returns:
+        Number of devices removed from latest:readings and latest:last_seen
+    """
+    if retention is None:
+        retention = getattr(settings, 'LATEST_READINGS_RETENTION', 7 * 24 * 3600)
+    if not redis_breaker.allow():
+        return 0
+    try:
+        client = get_redis_client()
+        prune = client.register_script(PRUNE_SCRIPT)
+        cutoff = time.time() - retention
+        pruned = 0
+        while True:
+            stale = prune(keys=[LATEST_READINGS_KEY, LAST_SEEN_KEY], args=[cutoff, PRUNE_BATCH_SIZE])
+            if stale:
+                client.publish(INVALIDATION_CHANNEL, ','.join(stale))
+                pruned += len(stale)
+            if len(stale) < PRUNE_BATCH_SIZE:
+                break
+        redis_breaker.success()
+        if pruned:
+            logger.info("✓ Pruned %d device(s) not seen for %ds from Redis", pruned, retention)
+        return pruned
+    except Exception as e:
+        redis_breaker.failure(e)
+        logger.warning("Failed to prune latest readings: %s", e)
+        return 0
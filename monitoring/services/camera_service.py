@@ -2,13 +2,29 @@
 Camera service - Camera recording triggers
 """
 
+import datetime
 import logging
 from django.utils import timezone
-from monitoring.models import Zone, BuildingAlert
+from monitoring.models import Zone, ZoneCamera, BuildingAlert
 
 logger = logging.getLogger(__name__)
 
 
+def build_recording_path(camera: ZoneCamera, alert_type: str, at: datetime.datetime) -> str:
+    """
+    Recording path for an alert that is not saved yet (no alert id)
+    
+    Args:
+        camera: Camera recording the alert
+        alert_type: BuildingAlert.alert_type
+        at: Alert time
+        
+    Returns:
+        Path under /recordings/<mediamtx_path>/
+    """
+    return f"/recordings/{camera.mediamtx_path}/{alert_type.lower()}_{camera.zone_id}_{at.strftime('%Y%m%d_%H%M%S')}.mp4"
+
+
 def trigger_camera_recording(zone: Zone, alert: BuildingAlert) -> bool:
     """
     Trigger camera recording when alert is created
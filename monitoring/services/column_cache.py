@@ -0,0 +1,326 @@
+"""
+Column cache - Local memory-mapped columns of each device's reading history
+
+Per device, three append-only files hold the readings oldest first:
+
+    <READINGS_COLUMN_CACHE_DIR>/<device_id>/timestamp.i8     int64 ms since epoch (UTC)
+    <READINGS_COLUMN_CACHE_DIR>/<device_id>/temperature.f8   float64, NaN if missing
+    <READINGS_COLUMN_CACHE_DIR>/<device_id>/humidity.f8      float64, NaN if missing
+    <READINGS_COLUMN_CACHE_DIR>/<device_id>/meta.json        {"count", "hwm", "created", "built"}
+
+A refresh appends the readings newer than the high-water mark (hwm) from
+ReadingClient.iter_history() - MongoDB plus the Parquet archive - up to
+READINGS_COLUMN_CACHE_LAG seconds ago, so readings that arrive slightly out
+of order are still picked up. Range queries and aggregates are then NumPy
+slicing (np.searchsorted on the timestamp column) over np.memmap views,
+with no round trip to MongoDB or OpenSearch.
+
+Readings that arrive later than the lag for an already cached time are not
+added; invalidate() the device to rebuild it.
+
+A device's first build reads its whole history, so request handlers call
+ready()/warm_up() to build it on a small background pool instead. At most
+READINGS_COLUMN_CACHE_MAX_OPEN devices keep their memmaps (three open file
+descriptors each) in a per-process LRU.
+"""
+
+import datetime
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+import numpy as np
+from django.conf import settings
+
+from monitoring.models import get_reading_client
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_MS = datetime.timedelta(milliseconds=1)
+
+# Column name -> dtype (file suffix is the numpy type code + size)
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),
+    'temperature': np.dtype('<f8'),
+    'humidity': np.dtype('<f8'),
+}
+
+# Background threads building devices' columns for the first time
+WARM_UP_WORKERS = 2
+
+
+def to_epoch_ms(value: datetime.datetime) -> int:
+    """Datetime (naive = UTC) -> ms since epoch"""
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - EPOCH) // ONE_MS
+
+
+def from_epoch_ms(value: int) -> datetime.datetime:
+    """ms since epoch -> naive UTC datetime"""
+    return EPOCH + datetime.timedelta(milliseconds=int(value))
+
+
+def _value(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+@dataclass
+class DeviceColumns:
+    """Read-only column views of one device, ordered by timestamp"""
+    timestamp: np.ndarray
+    temperature: np.ndarray
+    humidity: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def between(self, since: Optional[datetime.datetime] = None,
+                until: Optional[datetime.datetime] = None) -> "DeviceColumns":
+        """Readings in [since, until) - binary search + slice, no copy"""
+        start = 0 if since is None else int(np.searchsorted(self.timestamp, to_epoch_ms(since), 'left'))
+        end = len(self) if until is None else int(np.searchsorted(self.timestamp, to_epoch_ms(until), 'left'))
+        return DeviceColumns(self.timestamp[start:end], self.temperature[start:end], self.humidity[start:end])
+
+    def summary(self) -> Dict[str, Any]:
+        """count, first/last timestamp and min/max/avg of each value column"""
+        result: Dict[str, Any] = {
+            'count': len(self),
+            'first': from_epoch_ms(self.timestamp[0]) if len(self) else None,
+            'last': from_epoch_ms(self.timestamp[-1]) if len(self) else None,
+        }
+        for name in ('temperature', 'humidity'):
+            values = getattr(self, name)
+            values = values[~np.isnan(values)]
+            result[name] = {
+                'count': int(values.size),
+                'min': float(values.min()) if values.size else None,
+                'max': float(values.max()) if values.size else None,
+                'avg': float(values.mean()) if values.size else None,
+            }
+        return result
+
+
+def _empty_columns() -> DeviceColumns:
+    return DeviceColumns(*(np.empty(0, dtype=dtype) for dtype in COLUMNS.values()))
+
+
+class ColumnCache:
+    """Per-device memory-mapped reading columns, refreshed from a high-water mark"""
+
+    def __init__(self, root: Optional[str] = None, client=None):
+        self.root = str(root or getattr(settings, 'READINGS_COLUMN_CACHE_DIR', 'column_cache'))
+        self.client = client
+        self.lag = getattr(settings, 'READINGS_COLUMN_CACHE_LAG', 60)
+        self.refresh_interval = getattr(settings, 'READINGS_COLUMN_CACHE_REFRESH', 5)
+        self.max_open = getattr(settings, 'READINGS_COLUMN_CACHE_MAX_OPEN', 256)
+        self._lock = threading.Lock()
+        self._device_locks: Dict[int, threading.Lock] = {}
+        # device_id -> ((count, created), DeviceColumns) of the open memmaps,
+        # least recently used first
+        self._maps: "OrderedDict[int, tuple]" = OrderedDict()
+        # device_id -> monotonic time of the last refresh
+        self._refreshed: Dict[int, float] = {}
+        # Devices queued or being built by warm_up()
+        self._warming: Set[int] = set()
+        self._warm_up_pool: Optional[ThreadPoolExecutor] = None
+
+    def _dir(self, device_id: int) -> str:
+        return os.path.join(self.root, str(int(device_id)))
+
+    def _path(self, device_id: int, column: str) -> str:
+        dtype = COLUMNS[column]
+        return os.path.join(self._dir(device_id), f"{column}.{dtype.kind}{dtype.itemsize}")
+
+    def _read_meta(self, device_id: int) -> Dict[str, int]:
+        try:
+            with open(os.path.join(self._dir(device_id), 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'count': 0, 'hwm': -1}
+
+    def _write_meta(self, device_id: int, meta: Dict[str, int]):
+        path = os.path.join(self._dir(device_id), 'meta.json')
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    @contextmanager
+    def _writer(self, device_id: int):
+        """Exclusive writer of a device, across threads and processes"""
+        with self._lock:
+            lock = self._device_locks.setdefault(device_id, threading.Lock())
+        with lock:
+            os.makedirs(self._dir(device_id), exist_ok=True)
+            with open(os.path.join(self._dir(device_id), '.lock'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _append(self, device_id: int, meta: Dict[str, int], rows: list):
+        """Append rows to the column files, then publish the new count in meta.json"""
+        arrays = {
+            'timestamp': np.fromiter((row[0] for row in rows), COLUMNS['timestamp'], len(rows)),
+            'temperature': np.fromiter((row[1] for row in rows), COLUMNS['temperature'], len(rows)),
+            'humidity': np.fromiter((row[2] for row in rows), COLUMNS['humidity'], len(rows)),
+        }
+        for column, array in arrays.items():
+            path = self._path(device_id, column)
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                # Drop bytes of an append that never made it into meta.json
+                f.truncate(meta['count'] * array.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(array.tobytes())
+        if not meta['count']:
+            # Tells a rebuilt device apart from the one other processes have mapped
+            meta['created'] = time.time()
+        meta['count'] += len(rows)
+        meta['hwm'] = int(arrays['timestamp'][-1])
+        self._write_meta(device_id, meta)
+
+    def refresh(self, device_id: int, batch_size: int = 100000) -> int:
+        """
+        Append the readings newer than the device's high-water mark
+
+        Returns:
+            Number of readings appended
+        """
+        client = self.client or get_reading_client()
+        until = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.lag)
+        appended = 0
+        with self._writer(device_id):
+            meta = self._read_meta(device_id)
+            since = from_epoch_ms(meta['hwm'] + 1) if meta['hwm'] >= 0 else None
+            rows = []
+            for reading in client.iter_history(device_id, since=since, until=until):
+                rows.append((to_epoch_ms(reading['timestamp']),
+                             _value(reading.get('temperature')), _value(reading.get('humidity'))))
+                if len(rows) >= batch_size:
+                    self._append(device_id, meta, rows)
+                    appended += len(rows)
+                    rows = []
+            if rows:
+                self._append(device_id, meta, rows)
+                appended += len(rows)
+            if not meta.get('built'):
+                # Marks the device built for other processes even if it has no readings yet
+                meta['built'] = True
+                self._write_meta(device_id, meta)
+        self._refreshed[device_id] = time.monotonic()
+        if appended:
+            logger.debug("Column cache device %s: +%d readings", device_id, appended)
+        return appended
+
+    def columns(self, device_id: int) -> DeviceColumns:
+        """Memory-mapped columns of a device as of its last refresh"""
+        meta = self._read_meta(device_id)
+        count, version = meta['count'], (meta['count'], meta.get('created'))
+        with self._lock:
+            cached = self._maps.get(device_id)
+            if cached is not None and cached[0] == version:
+                self._maps.move_to_end(device_id)
+                return cached[1]
+        if not count:
+            return _empty_columns()
+        columns = DeviceColumns(*(
+            np.memmap(self._path(device_id, column), dtype=dtype, mode='r', shape=(count,))
+            for column, dtype in COLUMNS.items()
+        ))
+        with self._lock:
+            self._maps[device_id] = (version, columns)
+            self._maps.move_to_end(device_id)
+            # Evicted maps close their files once no caller holds a slice of them
+            while len(self._maps) > self.max_open:
+                self._maps.popitem(last=False)
+        return columns
+
+    def query(self, device_id: int, since: Optional[datetime.datetime] = None,
+              until: Optional[datetime.datetime] = None) -> DeviceColumns:
+        """
+        A device's readings in [since, until)
+
+        Refreshes the device first unless it was refreshed within
+        READINGS_COLUMN_CACHE_REFRESH seconds.
+        """
+        last = self._refreshed.get(device_id)
+        if last is None or time.monotonic() - last >= self.refresh_interval:
+            self.refresh(device_id)
+        return self.columns(device_id).between(since, until)
+
+    def ready(self, device_id: int) -> bool:
+        """The device's columns were built at least once (by any process)"""
+        if device_id in self._refreshed:
+            return True
+        meta = self._read_meta(device_id)
+        return bool(meta.get('built')) or meta['hwm'] >= 0
+
+    def warm_up(self, device_id: int):
+        """Build a device's columns on the background pool (no-op if already queued)"""
+        with self._lock:
+            if device_id in self._warming:
+                return
+            self._warming.add(device_id)
+            if self._warm_up_pool is None:
+                self._warm_up_pool = ThreadPoolExecutor(WARM_UP_WORKERS, thread_name_prefix='column-cache')
+
+        def build():
+            try:
+                appended = self.refresh(device_id)
+                logger.info("✓ Column cache built for device %s: %d readings", device_id, appended)
+            except Exception as e:
+                logger.warning("Column cache build failed for device %s: %s", device_id, e)
+            finally:
+                with self._lock:
+                    self._warming.discard(device_id)
+
+        self._warm_up_pool.submit(build)
+
+    def summary(self, device_id: int, since: Optional[datetime.datetime] = None,
+                until: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+        """count, first/last and min/max/avg per value over [since, until)"""
+        return self.query(device_id, since, until).summary()
+
+    def invalidate(self, device_id: int):
+        """Drop a device's columns; the next query rebuilds them"""
+        with self._writer(device_id):
+            with self._lock:
+                self._maps.pop(device_id, None)
+            self._refreshed.pop(device_id, None)
+            for column in COLUMNS:
+                try:
+                    os.remove(self._path(device_id, column))
+                except FileNotFoundError:
+                    pass
+            try:
+                os.remove(os.path.join(self._dir(device_id), 'meta.json'))
+            except FileNotFoundError:
+                pass
+
+
+# Column cache singleton
+_column_cache = None
+_column_cache_lock = threading.Lock()
+
+
+def get_column_cache() -> ColumnCache:
+    """Get the process-wide ColumnCache (READINGS_COLUMN_CACHE_DIR)"""
+    global _column_cache
+    if _column_cache is None:
+        with _column_cache_lock:
+            if _column_cache is None:
+                _column_cache = ColumnCache()
+    return _column_cache
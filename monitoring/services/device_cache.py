@@ -0,0 +1,136 @@
+"""
+Device cache - In-process resolution of external device ids to MySQL pks
+
+Ingest only needs the Device pk for each payload, and the Device rows
+almost never change, so the mapping is kept in a bounded LRU cache and
+MySQL is only hit on a miss. Entries are invalidated from the Device/User
+post_save and post_delete signals (see monitoring.signals), which only
+reach the process that made the change; in every other process (e.g. the
+ingest worker after an API/admin edit) entries expire after
+DEVICE_CACHE_TTL seconds.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from django.conf import settings
+
+from monitoring.models import Device, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USERNAME = 'default_user'
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used key"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def pop_if(self, predicate: Callable[[Any], bool]) -> None:
+        """Remove every key whose value matches predicate"""
+        with self._lock:
+            for key in [k for k, v in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+# Device name ("Device <external id>") -> (expiry, Device pk)
+_device_pks = LRUCache(getattr(settings, 'DEVICE_CACHE_SIZE', 10000))
+# (expiry, default User pk)
+_default_user: Optional[tuple] = None
+
+
+def _expiry() -> float:
+    return time.monotonic() + getattr(settings, 'DEVICE_CACHE_TTL', 60)
+
+
+def device_name(device_id: Any) -> str:
+    """MySQL Device name for an external (payload) device id"""
+    return f"Device {device_id}"
+
+
+def resolve_default_user_pk() -> int:
+    """Get the pk of the default ingest User, creating it on first use"""
+    global _default_user
+    cached = _default_user
+    if cached is not None and cached[0] >= time.monotonic():
+        return cached[1]
+    user, created = User.objects.get_or_create(username=DEFAULT_USERNAME)
+    if created:
+        logger.info("User created: username=%s, id=%s", user.username, user.id)
+    _default_user = (_expiry(), user.pk)
+    return user.pk
+
+
+def resolve_device_pk(device_id: Any) -> int:
+    """
+    Get the Device pk for an external device id
+
+    Served from the LRU cache; falls back to get_or_create on a miss or
+    when the entry is older than DEVICE_CACHE_TTL.
+    """
+    name = device_name(device_id)
+    entry = _device_pks.get(name)
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+
+    device, created = Device.objects.get_or_create(
+        name=name,
+        defaults={'user_id': resolve_default_user_pk()},
+    )
+    if created:
+        logger.info("Device created: name=%s, id=%s", device.name, device.id)
+    _device_pks.put(name, (_expiry(), device.pk))
+    return device.pk
+
+
+def invalidate_device(pk: int, name: Optional[str] = None) -> None:
+    """Drop cached entries for a Device (by name and by pk, in case it was renamed)"""
+    if name is not None:
+        _device_pks.pop(name)
+    _device_pks.pop_if(lambda entry: entry[1] == pk)
+
+
+def invalidate_default_user() -> None:
+    """Forget the cached default User pk"""
+    global _default_user
+    _default_user = None
+
+
+def clear_device_resolution_cache() -> None:
+    """Drop every cached device and user resolution"""
+    _device_pks.clear()
+    invalidate_default_user()
@@ -1,84 +1,247 @@
 """
 HVAC service - Automatic HVAC control logic
+
+The zone-level control loop keeps each zone's mean temperature incrementally
+in memory (fed by ingest), runs at most once per HVAC_CONTROL_INTERVAL
+seconds per zone (on a scheduler tick or when a batch touches the zone) and
+only writes HVACControl when the cooling/heating/fan state changes or the
+zone temperature drifted by HVAC_TEMPERATURE_DEADBAND.
 """
 
 import logging
-from monitoring.models import HVACControl, Zone
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+
+from monitoring.models import HVACControl, Zone, ZoneSensor
+from monitoring.streams.runner import run_periodic
+from .topology_service import get_topology
 
 logger = logging.getLogger(__name__)
 
 
+class ZoneTemperature:
+    """Running mean of the latest reading of each temperature sensor in a zone"""
+
+    def __init__(self):
+        self.values: Dict[int, float] = {}
+        self.total = 0.0
+        self.dirty = True
+        self.last_run = float('-inf')
+
+    def update(self, sensor_pk: int, value: float) -> None:
+        old = self.values.get(sensor_pk)
+        if old is not None:
+            self.total -= old
+        self.values[sensor_pk] = value
+        self.total += value
+        self.dirty = True
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / len(self.values) if self.values else None
+
+
+def _control(zone: Zone, hvac: HVACControl, current_temp: float) -> bool:
+    """
+    Apply the control logic to an HVAC and save only what changed
+
+    Returns:
+        True if HVACControl was written
+    """
+    target = zone.target_temperature
+    previous_cooling = hvac.is_cooling
+    previous_heating = hvac.is_heating
+
+    # Control logic
+    desired = {}
+    if current_temp > target + 1:
+        # Too hot - turn on cooling
+        desired = {
+            'is_cooling': True,
+            'is_heating': False,
+            'set_temperature': target,
+            'fan_speed': min(100, int((current_temp - target) * 20)),
+        }
+        if not previous_cooling:
+            logger.info("HVAC %s: Cooling ON (Current: %.1f°C, Target: %.1f°C, Fan: %d%%)",
+                       zone.name, current_temp, target, desired['fan_speed'])
+
+    elif current_temp < target - 1:
+        # Too cold - turn on heating
+        desired = {
+            'is_cooling': False,
+            'is_heating': True,
+            'set_temperature': target,
+            'fan_speed': min(100, int((target - current_temp) * 20)),
+        }
+        if not previous_heating:
+            logger.info("HVAC %s: Heating ON (Current: %.1f°C, Target: %.1f°C, Fan: %d%%)",
+                       zone.name, current_temp, target, desired['fan_speed'])
+
+    else:
+        # Temperature OK - standby
+        if previous_cooling or previous_heating:
+            logger.info("✓ HVAC %s: Standby (Current: %.1f°C, Target: %.1f°C)",
+                       zone.name, current_temp, target)
+        desired = {
+            'is_cooling': False,
+            'is_heating': False,
+            'fan_speed': 30,  # Low fan speed for circulation
+        }
+
+    changed = [name for name, value in desired.items() if getattr(hvac, name) != value]
+    deadband = getattr(settings, 'HVAC_TEMPERATURE_DEADBAND', 0.5)
+    drifted = hvac.current_temperature is None or abs(hvac.current_temperature - current_temp) >= deadband
+    if not changed and not drifted:
+        return False
+
+    for name in changed:
+        setattr(hvac, name, desired[name])
+    hvac.current_temperature = current_temp
+    # Only changed runtime fields - never overwrite mode changed through the API
+    hvac.save(update_fields=changed + ['current_temperature', 'last_updated'])
+    return True
+
+
+class HVACController:
+    """Debounced zone-level HVAC control loop"""
+
+    def __init__(self):
+        self._zones: Dict[int, ZoneTemperature] = {}
+        self._topology = None
+        self._lock = threading.Lock()
+
+    def _sync_topology(self):
+        """Re-seed zone means from the topology after it was rebuilt"""
+        topology = get_topology()
+        if topology is not self._topology:
+            previous = self._zones
+            self._zones = {}
+            for zone_id in topology.zones:
+                state = ZoneTemperature()
+                if zone_id in previous:
+                    state.last_run = previous[zone_id].last_run
+                for sensor in topology.zone_sensors(zone_id, 'TEMPERATURE'):
+                    if sensor.latest_reading is not None:
+                        state.update(sensor.pk, sensor.latest_reading)
+                self._zones[zone_id] = state
+            self._topology = topology
+        return topology
+
+    def observe(self, zone_sensor: ZoneSensor) -> None:
+        """Feed a temperature sensor's latest reading into its zone mean"""
+        if zone_sensor.sensor_type != 'TEMPERATURE' or zone_sensor.latest_reading is None:
+            return
+        with self._lock:
+            self._sync_topology()
+            state = self._zones.setdefault(zone_sensor.zone_id, ZoneTemperature())
+            state.update(zone_sensor.pk, float(zone_sensor.latest_reading))
+
+    def run_due(self, zone_ids: Optional[Iterable[int]] = None, force: bool = False) -> int:
+        """
+        Run the control loop for zones with new data whose interval elapsed
+
+        Args:
+            zone_ids: Limit to these zones (default: all zones)
+            force: Ignore the interval and dirty flag
+
+        Returns:
+            Number of HVACControl rows written
+        """
+        interval = getattr(settings, 'HVAC_CONTROL_INTERVAL', 30)
+        written = 0
+        with self._lock:
+            topology = self._sync_topology()
+            now = time.monotonic()
+            for zone_id in (self._zones if zone_ids is None else zone_ids):
+                state = self._zones.get(zone_id)
+                if state is None:
+                    continue
+                if not force and (not state.dirty or now - state.last_run < interval):
+                    continue
+                state.dirty = False
+                state.last_run = now
+
+                zone = topology.zones.get(zone_id)
+                hvac = topology.hvac_for_zone(zone_id)
+                if zone is None or hvac is None:
+                    continue
+                if hvac.mode != 'AUTO':
+                    logger.debug("HVAC in %s not in AUTO mode (current: %s), skipping control",
+                                 zone.name, hvac.mode)
+                    continue
+                if state.mean is None:
+                    logger.debug("No temperature readings available for %s", zone.name)
+                    continue
+                try:
+                    if _control(zone, hvac, state.mean):
+                        written += 1
+                except Exception as e:
+                    logger.error("HVAC control error in %s: %s", zone.name, e)
+        return written
+
+    def tick(self) -> int:
+        """Scheduler tick - control every zone that is due"""
+        return self.run_due()
+
+
+_controller = HVACController()
+
+
+def get_hvac_controller() -> HVACController:
+    """Get the process-wide HVAC controller"""
+    return _controller
+
+
+def run_hvac_control_loop():
+    """Tick the HVAC controller every HVAC_CONTROL_INTERVAL seconds (blocking)"""
+    run_periodic(
+        "HVAC control loop", getattr(settings, 'HVAC_CONTROL_INTERVAL', 30),
+        lambda: get_hvac_controller().tick(),
+    )
+
+
 def auto_control_hvac(zone: Zone) -> bool:
     """
-    Automatic HVAC control based on temperature
-    
+    Automatic HVAC control based on temperature (immediate, not debounced)
+
+    HVAC and temperature sensors are read from the in-memory zone topology,
+    so zones without HVAC or sensors cost no queries.
+
     Args:
         zone: The Zone instance to control HVAC for
-        
+
     Returns:
         True if HVAC was controlled, False otherwise
     """
     try:
-        hvac = zone.hvac
+        topology = get_topology()
+        hvac = topology.hvac_for_zone(zone.id)
+        if hvac is None:
+            logger.debug("No HVAC system found for zone: %s", zone.name)
+            return False
         if hvac.mode != 'AUTO':
-            logger.debug("HVAC in %s not in AUTO mode (current: %s), skipping control", 
+            logger.debug("HVAC in %s not in AUTO mode (current: %s), skipping control",
                          zone.name, hvac.mode)
             return False
-        
+
         # Get current temperature from sensors
-        temp_sensors = zone.sensors.filter(sensor_type='TEMPERATURE', is_active=True)
-        if not temp_sensors.exists():
+        temp_sensors = topology.zone_sensors(zone.id, 'TEMPERATURE')
+        if not temp_sensors:
             logger.debug("No temperature sensors found for %s", zone.name)
             return False
-        
+
         temps = [s.latest_reading for s in temp_sensors if s.latest_reading is not None]
         if not temps:
             logger.debug("No temperature readings available for %s", zone.name)
             return False
-        
-        current_temp = sum(temps) / len(temps)
-        hvac.current_temperature = current_temp
-        
-        # Control logic
-        target = zone.target_temperature
-        previous_cooling = hvac.is_cooling
-        previous_heating = hvac.is_heating
-        
-        if current_temp > target + 1:
-            # Too hot - turn on cooling
-            hvac.is_cooling = True
-            hvac.is_heating = False
-            hvac.set_temperature = target
-            hvac.fan_speed = min(100, int((current_temp - target) * 20))
-            if not previous_cooling:
-                logger.info("HVAC %s: Cooling ON (Current: %.1f°C, Target: %.1f°C, Fan: %d%%)", 
-                           zone.name, current_temp, target, hvac.fan_speed)
-            
-        elif current_temp < target - 1:
-            # Too cold - turn on heating
-            hvac.is_cooling = False
-            hvac.is_heating = True
-            hvac.set_temperature = target
-            hvac.fan_speed = min(100, int((target - current_temp) * 20))
-            if not previous_heating:
-                logger.info("HVAC %s: Heating ON (Current: %.1f°C, Target: %.1f°C, Fan: %d%%)", 
-                           zone.name, current_temp, target, hvac.fan_speed)
-            
-        else:
-            # Temperature OK - standby
-            if previous_cooling or previous_heating:
-                logger.info("✓ HVAC %s: Standby (Current: %.1f°C, Target: %.1f°C)", 
-                           zone.name, current_temp, target)
-            hvac.is_cooling = False
-            hvac.is_heating = False
-            hvac.fan_speed = 30  # Low fan speed for circulation
-        
-        hvac.save()
+
+        _control(zone, hvac, sum(temps) / len(temps))
         return True
-        
-    except HVACControl.DoesNotExist:
-        logger.debug("No HVAC system found for zone: %s", zone.name)
-        return False
+
     except Exception as e:
         logger.error("HVAC control error in %s: %s", zone.name, e)
         return False
@@ -0,0 +1,147 @@
+"""
+Presence service - Device online/offline status from the last-seen index
+
+Backed by the sorted set latest:last_seen (device_id -> unix time of the last
+reading, written by cache_service at ingest). Every question is a range
+query on the scores, so no request ever scans keys:
+
+- online:               last_seen >= now - DEVICE_ONLINE_WINDOW
+- went offline in N min: now - window - N*60 <= last_seen < now - window
+
+The sweeper thread walks the window boundary every PRESENCE_SWEEP_INTERVAL
+seconds and sends device_went_offline for each device that crossed it, then
+prunes devices not seen for LATEST_READINGS_RETENTION seconds.
+
+Members are the raw payload device ids: numeric ones are returned as int,
+anything else as the stored string.
+"""
+
+import logging
+import time
+from typing import Any, List, Tuple
+
+from django.conf import settings
+from django.dispatch import Signal
+
+from monitoring.streams.runner import run_periodic
+from .cache_service import (
+    LAST_SEEN_KEY, get_redis_client, prune_latest_readings, redis_breaker, _device_sort_key, _online_since
+)
+
+logger = logging.getLogger(__name__)
+
+# Sent with device_id and last_seen (unix time) when a device goes offline
+device_went_offline = Signal()
+
+
+def _device_id(member: str) -> Any:
+    """Last-seen member -> device id (int when numeric, else unchanged)"""
+    try:
+        return int(member)
+    except ValueError:
+        return member
+
+
+def get_online_device_ids() -> List[Any]:
+    """
+    Get ids of devices seen within DEVICE_ONLINE_WINDOW (one round trip)
+
+    Returns:
+        Sorted list of device ids
+    """
+    if not redis_breaker.allow():
+        return []
+    try:
+        members = get_redis_client().zrangebyscore(LAST_SEEN_KEY, _online_since(), '+inf')
+        redis_breaker.success()
+        return sorted(map(_device_id, members), key=_device_sort_key)
+    except Exception as e:
+        redis_breaker.failure(e)
+        logger.error("Failed to get online devices from Redis: %s", e)
+        return []
+
+
+def count_online_devices() -> int:
+    """Number of devices seen within DEVICE_ONLINE_WINDOW (ZCOUNT)"""
+    if not redis_breaker.allow():
+        return 0
+    try:
+        count = get_redis_client().zcount(LAST_SEEN_KEY, _online_since(), '+inf')
+        redis_breaker.success()
+        return count
+    except Exception as e:
+        redis_breaker.failure(e)
+        logger.error("Failed to count online devices from Redis: %s", e)
+        return 0
+
+
+def get_recently_offline(minutes: int) -> List[Tuple[Any, float]]:
+    """
+    Get devices that went offline in the last N minutes
+
+    Args:
+        minutes: Look-back period
+
+    Returns:
+        (device_id, last_seen unix time) tuples, most recent first
+    """
+    if not redis_breaker.allow():
+        return []
+    cutoff = _online_since()
+    try:
+        members = get_redis_client().zrevrangebyscore(
+            LAST_SEEN_KEY, f"({cutoff}", cutoff - minutes * 60, withscores=True
+        )
+        redis_breaker.success()
+        return [(_device_id(device_id), last_seen) for device_id, last_seen in members]
+    except Exception as e:
+        redis_breaker.failure(e)
+        logger.error("Failed to get offline devices from Redis: %s", e)
+        return []
+
+
+class PresenceSweeper:
+    """Emits offline transitions by walking the online window boundary"""
+
+    def __init__(self):
+        # Devices already offline at start-up are not reported
+        self._swept_until = _online_since()
+
+    def sweep(self) -> List[Tuple[Any, float]]:
+        """
+        Report devices whose last_seen fell out of the window since last sweep
+
+        The window start only advances once every transition was sent; a
+        failing receiver is logged and does not hold back the others.
+
+        Returns:
+            (device_id, last_seen) tuples of devices that went offline
+        """
+        cutoff = _online_since()
+        members = get_redis_client().zrangebyscore(
+            LAST_SEEN_KEY, self._swept_until, f"({cutoff}", withscores=True
+        )
+
+        transitions = [(_device_id(device_id), last_seen) for device_id, last_seen in members]
+        for device_id, last_seen in transitions:
+            logger.info("Device %s went offline (last seen %.0fs ago)",
+                        device_id, time.time() - last_seen)
+            responses = device_went_offline.send_robust(
+                sender=PresenceSweeper, device_id=device_id, last_seen=last_seen
+            )
+            for receiver, response in responses:
+                if isinstance(response, Exception):
+                    logger.warning("device_went_offline receiver %s failed: %s", receiver, response)
+        self._swept_until = cutoff
+        return transitions
+
+
+def run_presence_sweeper():
+    """Sweep offline devices and prune stale ones every PRESENCE_SWEEP_INTERVAL seconds (blocking)"""
+    sweeper = PresenceSweeper()
+
+    def sweep():
+        sweeper.sweep()
+        prune_latest_readings()
+
+    run_periodic("Presence sweeper", getattr(settings, 'PRESENCE_SWEEP_INTERVAL', 10), sweep)
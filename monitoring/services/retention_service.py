@@ -0,0 +1,164 @@
+"""
+Retention service - Bounded storage for readings
+
+- Raw readings stay in MongoDB for READINGS_HOT_DAYS, then are archived to
+  Parquet (one file per device and day, see monitoring.models.archive) and
+  deleted from MongoDB; ReadingClient.iter_history() still serves them.
+- Rollups are kept per level for READINGS_ROLLUP_RETENTION_DAYS (minutes for
+  weeks, hours for years, days forever by default).
+- The sensor-readings OpenSearch index keeps OPENSEARCH_RETENTION_DAYS.
+
+A retention setting of 0 keeps that data forever; raw and OpenSearch
+retention default to 0. Archived days live only in READINGS_ARCHIVE_DIR, so
+that directory must be on persistent storage before READINGS_HOT_DAYS is set.
+"""
+
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+from monitoring.models import get_reading_archive, get_reading_client
+from monitoring.models.mongodb import ROLLUP_LEVELS
+from monitoring.streams.runner import run_periodic
+from .search_service import READINGS_INDEX, get_opensearch_client
+
+logger = logging.getLogger(__name__)
+
+
+def _midnight(now: Optional[datetime.datetime] = None) -> datetime.datetime:
+    """Start of the current day, naive UTC"""
+    now = now or datetime.datetime.utcnow()
+    return datetime.datetime.combine(now.date(), datetime.time())
+
+
+class RetentionManager:
+    """Archives and trims reading data past its retention"""
+
+    def __init__(self, client=None, archive=None):
+        self.client = client or get_reading_client()
+        self.archive = archive or get_reading_archive()
+
+    def archive_raw(self, now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """
+        Move raw readings older than READINGS_HOT_DAYS to the Parquet archive
+
+        Works a day at a time, oldest first: write every device's file, move
+        the archive watermark past the day, then delete the day's documents
+        inserted before this run started, so a reading inserted meanwhile is
+        never lost. A late reading for an archived day is merged into its
+        file on the next run. Deletes decrement the reading counters.
+
+        Returns:
+            {'readings': archived, 'deleted': deleted from MongoDB}
+        """
+        hot_days = getattr(settings, 'READINGS_HOT_DAYS', 0)
+        result = {'readings': 0, 'deleted': 0}
+        if not hot_days:
+            return result
+        if not self.archive.available:
+            logger.warning("pyarrow is not installed - raw readings are kept in MongoDB")
+            return result
+
+        started = datetime.datetime.utcnow()
+        cutoff = _midnight(now) - datetime.timedelta(days=hot_days)
+        oldest = self.client.oldest_timestamp()
+        if oldest is None:
+            return result
+
+        day = _midnight(oldest)
+        while day < cutoff:
+            next_day = day + datetime.timedelta(days=1)
+            device_ids = self.client.device_ids_between(day, next_day)
+            archived = 0
+            for device_id in device_ids:
+                readings = list(self.client.iter_readings(device_id, day, next_day))
+                self.archive.write_day(device_id, day.date(), readings)
+                archived += len(readings)
+            self.archive.set_watermark(next_day)
+            for device_id in device_ids:
+                result['deleted'] += self.client.delete_readings(device_id, day, next_day, inserted_before=started)
+            result['readings'] += archived
+            logger.info("✓ Archived %s: %d readings", day.date(), archived)
+            day = next_day
+        return result
+
+    def trim_rollups(self, now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """
+        Delete rollup buckets older than their level's retention
+
+        Returns:
+            Deleted documents per level label
+        """
+        retention = getattr(settings, 'READINGS_ROLLUP_RETENTION_DAYS', {})
+        deleted = {}
+        for level in ROLLUP_LEVELS:
+            days = retention.get(level.label)
+            if days:
+                before = _midnight(now) - datetime.timedelta(days=days)
+                deleted[level.label] = self.client.delete_rollups(level, before)
+        return deleted
+
+    def trim_search_index(self, now: Optional[datetime.datetime] = None) -> Optional[str]:
+        """
+        Delete sensor-readings documents older than OPENSEARCH_RETENTION_DAYS
+
+        Readings share one index rather than daily indices, so this is an
+        asynchronous _delete_by_query on the timestamp range.
+
+        Returns:
+            OpenSearch task id, or None if retention is disabled
+        """
+        days = getattr(settings, 'OPENSEARCH_RETENTION_DAYS', 0)
+        if not days:
+            return None
+        before = _midnight(now) - datetime.timedelta(days=days)
+        response = get_opensearch_client().delete_by_query(
+            index=READINGS_INDEX,
+            body={"query": {"range": {"timestamp": {"lt": before.isoformat()}}}},
+            conflicts='proceed',
+            wait_for_completion=False,
+            ignore_unavailable=True,
+        )
+        return response.get('task')
+
+    def run(self, now: Optional[datetime.datetime] = None) -> Dict[str, Any]:
+        """Run every retention step; a failing step does not stop the others"""
+        summary: Dict[str, Any] = {}
+        steps = (
+            ('raw', self.archive_raw),
+            ('rollups', self.trim_rollups),
+            ('search', self.trim_search_index),
+        )
+        for name, step in steps:
+            try:
+                summary[name] = step(now)
+            except Exception as e:
+                logger.warning("Retention step %s failed: %s", name, e)
+        logger.info("✓ Retention run: %s", summary)
+        return summary
+
+
+# Retention manager singleton
+_retention_manager = None
+_retention_manager_lock = threading.Lock()
+
+
+def get_retention_manager() -> RetentionManager:
+    """Get the process-wide RetentionManager"""
+    global _retention_manager
+    if _retention_manager is None:
+        with _retention_manager_lock:
+            if _retention_manager is None:
+                _retention_manager = RetentionManager()
+    return _retention_manager
+
+
+def run_retention_loop():
+    """Archive and trim reading data now and every RETENTION_INTERVAL seconds (blocking)"""
+    run_periodic(
+        "Retention loop", getattr(settings, 'RETENTION_INTERVAL', 3600),
+        get_retention_manager().run, run_first=True,
+    )
@@ -0,0 +1,314 @@
+"""
+Rule engine - Vectorized threshold evaluation for zone sensors
+
+Zone thresholds are compiled into NumPy arrays (one row per active zone
+sensor) and a whole micro-batch of readings is checked with a handful of
+array operations. Sensor types are described by DEFAULT_SENSOR_RULES, so a new
+sensor type is a new rule entry, not a new code branch.
+
+Rule keys:
+    field           Payload field holding the sensor value
+    unit            Unit shown in alert messages
+    alert_type      BuildingAlert.alert_type of the breach
+    min / max       Zone attribute name, a number, or None (no bound)
+    low_severity    Severity below min
+    high_severity   Severity above max
+    critical_below  CRITICAL when value < min - critical_below
+    critical_above  CRITICAL when value > max + critical_above
+    after_hours     Only alert outside the zone operating hours
+    hysteresis      An open alert only clears once the value is back inside
+                    [min + hysteresis, max - hysteresis]
+    low_title / high_title / low_message / high_message
+                    Alert texts, formatted with zone, value, unit, min, max
+"""
+
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from monitoring.models import ZoneSensor
+from .topology_service import get_topology
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENSOR_RULES: Dict[str, Dict[str, Any]] = {
+    'TEMPERATURE': {
+        'field': 'temperature',
+        'unit': '°C',
+        'alert_type': 'TEMPERATURE',
+        'hysteresis': 0.5,
+        'min': 'temp_min',
+        'max': 'temp_max',
+        'low_severity': 'WARNING',
+        'high_severity': 'WARNING',
+        'critical_above': 3.0,
+        'low_title': 'Temperature Too Low',
+        'high_title': 'Temperature Too High',
+        'low_message': '{zone}: {value}{unit} (Min: {min}{unit})',
+        'high_message': '{zone}: {value}{unit} (Max: {max}{unit})',
+    },
+    'HUMIDITY': {
+        'field': 'humidity',
+        'unit': '%',
+        'alert_type': 'HUMIDITY',
+        'hysteresis': 2.0,
+        'min': 'humidity_min',
+        'max': 'humidity_max',
+        'low_severity': 'WARNING',
+        'high_severity': 'WARNING',
+        'low_title': 'Humidity Out of Range',
+        'high_title': 'Humidity Out of Range',
+        'low_message': '{zone}: {value}{unit} (Range: {min}-{max}{unit})',
+        'high_message': '{zone}: {value}{unit} (Range: {min}-{max}{unit})',
+    },
+    'CO2': {
+        'field': 'co2',
+        'unit': 'ppm',
+        'alert_type': 'CO2',
+        'hysteresis': 50.0,
+        'min': None,
+        'max': 1000.0,
+        'high_severity': 'WARNING',
+        'critical_above': 1000.0,
+        'high_title': 'CO2 Level Too High',
+        'high_message': '{zone}: {value}{unit} (Max: {max}{unit})',
+    },
+    'LIGHT': {
+        'field': 'light',
+        'unit': 'lux',
+        'alert_type': 'LIGHT',
+        'hysteresis': 10.0,
+        'min': 100.0,
+        'max': None,
+        'low_severity': 'INFO',
+        'low_title': 'Light Level Too Low',
+        'low_message': '{zone}: {value}{unit} (Min: {min}{unit})',
+    },
+    'MOTION': {
+        'field': 'motion',
+        'unit': '',
+        'alert_type': 'MOTION',
+        'hysteresis': 0.0,
+        'min': None,
+        'max': 0.0,
+        'high_severity': 'WARNING',
+        'after_hours': True,
+        'high_title': 'Motion Detected After Hours',
+        'high_message': '{zone}: motion detected outside operating hours',
+    },
+    'DOOR': {
+        'field': 'door',
+        'unit': '',
+        'alert_type': 'DOOR',
+        'hysteresis': 0.0,
+        'min': None,
+        'max': 0.0,
+        'high_severity': 'WARNING',
+        'after_hours': True,
+        'high_title': 'Door Opened After Hours',
+        'high_message': '{zone}: door opened outside operating hours',
+    },
+}
+
+SEVERITIES = ['INFO', 'WARNING', 'CRITICAL', 'EMERGENCY']
+_SEVERITY_INDEX = {name: index for index, name in enumerate(SEVERITIES)}
+_CRITICAL = _SEVERITY_INDEX['CRITICAL']
+
+
+def get_sensor_rules() -> Dict[str, Dict[str, Any]]:
+    """Sensor rules, with per-type overrides from settings.SENSOR_THRESHOLD_RULES"""
+    overrides = getattr(settings, 'SENSOR_THRESHOLD_RULES', {})
+    rules = {name: dict(rule) for name, rule in DEFAULT_SENSOR_RULES.items()}
+    for name, rule in overrides.items():
+        rules.setdefault(name, {}).update(rule)
+    return rules
+
+
+@dataclass
+class Breach:
+    """A reading that breached its zone sensor threshold"""
+    zone_sensor: ZoneSensor
+    alert_type: str
+    severity: str
+    direction: str  # 'LOW' or 'HIGH'
+    value: float
+    timestamp: datetime.datetime
+    title: str
+    message: str
+    occurrences: int = 1
+
+    @property
+    def zone(self):
+        return self.zone_sensor.zone
+
+
+def _bound(zone, spec, default: float) -> float:
+    """Resolve a rule bound (zone attribute name, number or None)"""
+    if spec is None:
+        return default
+    if isinstance(spec, str):
+        value = getattr(zone, spec, None)
+        return default if value is None else float(value)
+    return float(spec)
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _in_operating_hours(zone, ts: datetime.datetime) -> bool:
+    start, end = zone.operating_start, zone.operating_end
+    if isinstance(start, str):
+        start = datetime.time.fromisoformat(start)
+    if isinstance(end, str):
+        end = datetime.time.fromisoformat(end)
+    now = (timezone.localtime(ts) if timezone.is_aware(ts) else ts).time()
+    if start <= end:
+        return start <= now < end
+    return now >= start or now < end  # Overnight window
+
+
+class ThresholdEngine:
+    """Zone thresholds compiled into arrays, one row per zone sensor with a rule"""
+
+    def __init__(self, sensors: Sequence[ZoneSensor], rules: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.rules = rules if rules is not None else get_sensor_rules()
+        self.sensors: List[ZoneSensor] = []
+        self.rows_by_device: Dict[int, List[int]] = {}
+
+        low, high, crit_low, crit_high, clear_low, clear_high = [], [], [], [], [], []
+        low_sev, high_sev, after_hours = [], [], []
+        for sensor in sensors:
+            rule = self.rules.get(sensor.sensor_type)
+            if rule is None:
+                continue
+            zone = sensor.zone
+            row_low = _bound(zone, rule.get('min'), -np.inf)
+            row_high = _bound(zone, rule.get('max'), np.inf)
+            low.append(row_low)
+            high.append(row_high)
+            crit_low.append(row_low - rule.get('critical_below', np.inf))
+            crit_high.append(row_high + rule.get('critical_above', np.inf))
+            clear_low.append(row_low + rule.get('hysteresis', 0.0))
+            clear_high.append(row_high - rule.get('hysteresis', 0.0))
+            low_sev.append(_SEVERITY_INDEX[rule.get('low_severity', 'WARNING')])
+            high_sev.append(_SEVERITY_INDEX[rule.get('high_severity', 'WARNING')])
+            after_hours.append(bool(rule.get('after_hours', False)))
+            self.rows_by_device.setdefault(sensor.device_id, []).append(len(self.sensors))
+            self.sensors.append(sensor)
+
+        self.low = np.array(low, dtype=np.float64)
+        self.high = np.array(high, dtype=np.float64)
+        self.crit_low = np.array(crit_low, dtype=np.float64)
+        self.crit_high = np.array(crit_high, dtype=np.float64)
+        self.clear_low = np.array(clear_low, dtype=np.float64)
+        self.clear_high = np.array(clear_high, dtype=np.float64)
+        self.low_sev = np.array(low_sev, dtype=np.int8)
+        self.high_sev = np.array(high_sev, dtype=np.int8)
+        self.after_hours = np.array(after_hours, dtype=bool)
+
+    def evaluate(self, readings: Sequence[Tuple[int, Dict[str, Any], datetime.datetime]]) -> List[Breach]:
+        """
+        Evaluate a micro-batch of readings in one vectorized pass
+
+        Args:
+            readings: (device pk, payload data, timestamp) tuples
+
+        Returns:
+            One Breach per (reading, zone sensor) out of range
+        """
+        return self.evaluate_batch(readings)[0]
+
+    def evaluate_batch(self, readings: Sequence[Tuple[int, Dict[str, Any], datetime.datetime]]
+                       ) -> Tuple[List[Breach], List[Tuple[ZoneSensor, str]]]:
+        """
+        Evaluate a micro-batch of readings, also reporting hysteresis clears
+
+        Returns:
+            (breaches, clears) - clears are (zone sensor, alert_type) pairs whose
+            reading is back inside the hysteresis band
+        """
+        rows, values, reading_index = [], [], []
+        for index, (device_pk, data, _ts) in enumerate(readings):
+            for row in self.rows_by_device.get(device_pk, ()):
+                field = self.rules[self.sensors[row].sensor_type]['field']
+                rows.append(row)
+                values.append(_to_float(data.get(field)))
+                reading_index.append(index)
+        if not rows:
+            return [], []
+
+        rows = np.array(rows, dtype=np.intp)
+        values = np.array(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        is_low = valid & (values < self.low[rows])
+        is_high = valid & (values > self.high[rows])
+        breached = is_low | is_high
+        cleared = valid & (values >= self.clear_low[rows]) & (values <= self.clear_high[rows])
+
+        # Time-of-day rules: drop breaches inside operating hours
+        gated = np.flatnonzero(breached & self.after_hours[rows])
+        for i in gated:
+            sensor = self.sensors[rows[i]]
+            if _in_operating_hours(sensor.zone, readings[reading_index[i]][2]):
+                breached[i] = False
+
+        severity = np.where(is_low, self.low_sev[rows], self.high_sev[rows])
+        critical = (is_low & (values < self.crit_low[rows])) | (is_high & (values > self.crit_high[rows]))
+        severity = np.where(critical, np.maximum(severity, _CRITICAL), severity)
+
+        breaches = []
+        for i in np.flatnonzero(breached):
+            sensor = self.sensors[rows[i]]
+            rule = self.rules[sensor.sensor_type]
+            _device_pk, data, ts = readings[reading_index[i]]
+            direction = 'LOW' if is_low[i] else 'HIGH'
+            prefix = direction.lower()
+            zone = sensor.zone
+            text = {
+                'zone': zone.name,
+                'value': data.get(rule['field']),
+                'unit': rule.get('unit', ''),
+                'min': _bound(zone, rule.get('min'), -np.inf),
+                'max': _bound(zone, rule.get('max'), np.inf),
+            }
+            breaches.append(Breach(
+                zone_sensor=sensor,
+                alert_type=rule['alert_type'],
+                severity=SEVERITIES[severity[i]],
+                direction=direction,
+                value=float(values[i]),
+                timestamp=ts,
+                title=rule.get(f'{prefix}_title', f"{sensor.get_sensor_type_display()} Out of Range"),
+                message=rule.get(f'{prefix}_message', '{zone}: {value}{unit}').format(**text),
+            ))
+
+        clears = []
+        for i in np.flatnonzero(cleared):
+            sensor = self.sensors[rows[i]]
+            clears.append((sensor, self.rules[sensor.sensor_type]['alert_type']))
+        return breaches, clears
+
+
+_engine: Optional[ThresholdEngine] = None
+_engine_topology = None
+
+
+def get_threshold_engine() -> ThresholdEngine:
+    """Get the engine compiled for the current zone topology"""
+    global _engine, _engine_topology
+    topology = get_topology()
+    if _engine is None or _engine_topology is not topology:
+        sensors = [s for zone_sensors in topology.by_zone.values() for s in zone_sensors]
+        _engine = ThresholdEngine(sensors)
+        _engine_topology = topology
+        logger.debug("Threshold engine compiled: %d rule row(s)", len(_engine.sensors))
+    return _engine
@@ -0,0 +1,231 @@
+"""
+Search service - Shared OpenSearch client and buffered bulk indexing
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from opensearchpy import OpenSearch
+from opensearchpy.exceptions import ConnectionError as OSConnectionError, TransportError
+
+logger = logging.getLogger(__name__)
+
+READINGS_INDEX = 'sensor-readings'
+
+# OpenSearch client singleton
+_os_client = None
+_os_client_lock = threading.Lock()
+
+# Readings indexer singleton
+_reading_indexer = None
+_reading_indexer_lock = threading.Lock()
+
+
+def get_opensearch_client() -> OpenSearch:
+    """
+    Get or create the process-wide OpenSearch client
+
+    The client keeps a pool of keep-alive HTTP connections per node and
+    gzip-compresses request bodies, so it is safe and cheap to share.
+    """
+    global _os_client
+    if _os_client is None:
+        with _os_client_lock:
+            if _os_client is None:
+                hosts = getattr(settings, 'OPENSEARCH_HOSTS', ['opensearch:9200'])
+                _os_client = OpenSearch(
+                    hosts=hosts,
+                    use_ssl=False,
+                    verify_certs=False,
+                    http_compress=True,
+                    maxsize=getattr(settings, 'OPENSEARCH_POOL_MAXSIZE', 10),
+                    timeout=getattr(settings, 'OPENSEARCH_TIMEOUT', 10),
+                    retry_on_timeout=True,
+                )
+    return _os_client
+
+
+class BulkIndexer:
+    """
+    Buffered _bulk indexer
+
+    Documents are buffered in memory and flushed with one _bulk request when
+    max_docs documents are buffered or the oldest one is max_age seconds old.
+    Documents the cluster rejects with 429 (write queue full) are retried with
+    exponential backoff, blocking the caller meanwhile (backpressure); other
+    per-document errors are logged and dropped. If the cluster cannot be
+    reached the documents are put back at once and add() stops flushing;
+    only the background flusher retries until a request succeeds again, so
+    an outage never stalls the caller. At most max_buffer documents are
+    held, the oldest ones are dropped beyond that.
+    """
+
+    def __init__(self, index: str, client: Optional[OpenSearch] = None,
+                 max_docs: int = 500, max_age: float = 2.0, max_buffer: int = 20000,
+                 max_retries: int = 5, backoff: float = 0.5):
+        self.index = index
+        self.client = client
+        self.max_docs = max_docs
+        self.max_age = max_age
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._buffer: List[Dict[str, Any]] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+        # False after a connection error, until a _bulk request succeeds
+        self._reachable = True
+
+    def add(self, doc_id: str, source: Dict[str, Any]) -> None:
+        """Buffer one document, flushing if a threshold is reached"""
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append({'_id': doc_id, '_source': source})
+            if len(self._buffer) > self.max_buffer:
+                dropped = len(self._buffer) - self.max_buffer
+                del self._buffer[:dropped]
+                logger.error("OpenSearch indexer buffer full, dropped %d oldest document(s)", dropped)
+        self.maybe_flush()
+
+    def maybe_flush(self, background: bool = False) -> int:
+        """
+        Flush if the buffer reached max_docs or max_age
+
+        Args:
+            background: Called by the background flusher, which keeps
+                flushing while the cluster is unreachable
+        """
+        if not self._reachable and not background:
+            return 0
+        with self._lock:
+            due = len(self._buffer) >= self.max_docs or (
+                self._buffer and time.monotonic() - self._oldest >= self.max_age
+            )
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """
+        Send all buffered documents with _bulk
+
+        Returns:
+            Number of documents indexed
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+                self._oldest = None
+            if not pending:
+                return 0
+
+            indexed = 0
+            for attempt in range(self.max_retries + 1):
+                ok, pending = self._send(pending)
+                indexed += ok
+                if not pending or not self._reachable:
+                    break
+                if attempt < self.max_retries:
+                    delay = self.backoff * (2 ** attempt)
+                    logger.warning("OpenSearch rejected %d document(s), retrying in %.1fs",
+                                   len(pending), delay)
+                    time.sleep(delay)
+
+            if pending:
+                # Still rejected - put them back for the next flush
+                with self._lock:
+                    self._buffer[:0] = pending
+                    self._oldest = time.monotonic()
+                if self._reachable:
+                    logger.error("OpenSearch still rejecting %d document(s) after %d retries",
+                                 len(pending), self.max_retries)
+                else:
+                    logger.debug("OpenSearch unreachable, %d document(s) kept for the background flusher",
+                                   len(pending))
+
+            logger.debug("✓ Bulk indexed %d document(s) to %s", indexed, self.index)
+            return indexed
+
+    def _send(self, docs: List[Dict[str, Any]]):
+        """
+        Send one _bulk request
+
+        Returns:
+            (number indexed, documents to retry); on a connection error all
+            documents are returned and the indexer is marked unreachable
+        """
+        body = []
+        for doc in docs:
+            body.append({'index': {'_index': self.index, '_id': doc['_id']}})
+            body.append(doc['_source'])
+
+        client = self.client or get_opensearch_client()
+        try:
+            response = client.bulk(body=body)
+        except OSConnectionError as e:
+            if self._reachable:
+                logger.error("OpenSearch bulk request failed: %s", e)
+            self._reachable = False
+            return 0, docs
+        except TransportError as e:
+            self._reachable = True
+            if getattr(e, 'status_code', None) in (429, 503):
+                return 0, docs
+            logger.error("OpenSearch bulk request failed: %s", e)
+            return 0, []
+
+        self._reachable = True
+
+        if not response.get('errors'):
+            return len(docs), []
+
+        indexed = 0
+        retry = []
+        for doc, item in zip(docs, response['items']):
+            result = item.get('index', {})
+            status = result.get('status', 500)
+            if status < 300:
+                indexed += 1
+            elif status == 429:
+                retry.append(doc)
+            else:
+                logger.warning("OpenSearch failed to index %s: %s", doc['_id'], result.get('error'))
+        return indexed, retry
+
+    def start_background_flusher(self) -> None:
+        """Start a daemon thread that flushes documents older than max_age"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+
+        def _run():
+            while True:
+                time.sleep(self.max_age / 2)
+                try:
+                    self.maybe_flush(background=True)
+                except Exception:
+                    logger.exception("OpenSearch background flush failed")
+
+        self._flusher = threading.Thread(target=_run, daemon=True)
+        self._flusher.start()
+
+
+def get_reading_indexer() -> BulkIndexer:
+    """Get or create the process-wide indexer for the sensor-readings index"""
+    global _reading_indexer
+    if _reading_indexer is None:
+        with _reading_indexer_lock:
+            if _reading_indexer is None:
+                indexer = BulkIndexer(
+                    READINGS_INDEX,
+                    max_docs=getattr(settings, 'OPENSEARCH_BULK_MAX_DOCS', 500),
+                    max_age=getattr(settings, 'OPENSEARCH_BULK_MAX_AGE', 2.0),
+                    max_buffer=getattr(settings, 'OPENSEARCH_BULK_MAX_BUFFER', 20000),
+                    max_retries=getattr(settings, 'OPENSEARCH_BULK_MAX_RETRIES', 5),
+                )
+                indexer.start_background_flusher()
+                _reading_indexer = indexer
+    return _reading_indexer
@@ -0,0 +1,118 @@
+"""
+Topology service - In-memory Smart Building topology for ingest fan-out
+
+Index: device pk -> active ZoneSensor(s) -> Zone (thresholds) -> HVACControl,
+plus zone -> active camera. Loaded with three queries, rebuilt lazily after
+a ZoneSensor/Zone/HVACControl/ZoneCamera change (post_save/post_delete, see
+monitoring.signals) or after TOPOLOGY_CACHE_TTL seconds, so changes made in
+other processes are picked up too. Readings from devices that are not in any
+zone cost no queries.
+
+The cached ZoneSensor/Zone/HVACControl instances are shared by the ingest
+pipeline; runtime fields (latest readings, HVAC state) are updated in place.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Iterable
+
+from django.conf import settings
+
+from monitoring.models import ZoneSensor, ZoneCamera, Zone, HVACControl
+
+logger = logging.getLogger(__name__)
+
+# Fields written by the ingest pipeline itself; saving only these must not
+# invalidate the topology.
+ZONE_SENSOR_RUNTIME_FIELDS = frozenset({'latest_reading', 'latest_reading_time'})
+HVAC_RUNTIME_FIELDS = frozenset({
+    'current_temperature', 'set_temperature', 'fan_speed',
+    'is_cooling', 'is_heating', 'power_consumption', 'last_updated',
+})
+
+
+class ZoneTopology:
+    """Snapshot of active zone sensors, their zones, HVAC systems and cameras"""
+
+    def __init__(self, sensors: Iterable[ZoneSensor], hvacs: Iterable[HVACControl],
+                 cameras: Iterable[ZoneCamera] = ()):
+        self.zones: Dict[int, Zone] = {}
+        self.by_device: Dict[int, List[ZoneSensor]] = defaultdict(list)
+        self.by_zone: Dict[int, List[ZoneSensor]] = defaultdict(list)
+        self.hvac_by_zone: Dict[int, HVACControl] = {}
+        self.camera_by_zone: Dict[int, ZoneCamera] = {}
+
+        for sensor in sensors:
+            # Share one Zone instance between all sensors of the zone
+            zone = self.zones.setdefault(sensor.zone_id, sensor.zone)
+            sensor.zone = zone
+            self.by_device[sensor.device_id].append(sensor)
+            self.by_zone[sensor.zone_id].append(sensor)
+
+        for hvac in hvacs:
+            zone = self.zones.get(hvac.zone_id)
+            if zone is not None:
+                hvac.zone = zone
+            self.hvac_by_zone[hvac.zone_id] = hvac
+
+        # First active camera per zone (cameras are ordered by pk)
+        for camera in cameras:
+            self.camera_by_zone.setdefault(camera.zone_id, camera)
+
+        self.loaded_at = time.monotonic()
+
+    @classmethod
+    def load(cls) -> "ZoneTopology":
+        sensors = ZoneSensor.objects.filter(is_active=True).select_related('zone')
+        hvacs = HVACControl.objects.all()
+        cameras = ZoneCamera.objects.filter(is_active=True).order_by('pk')
+        return cls(list(sensors), list(hvacs), list(cameras))
+
+    def sensors_for_device(self, device_pk: int) -> List[ZoneSensor]:
+        """Active ZoneSensors backed by a Device"""
+        return self.by_device.get(device_pk, [])
+
+    def zone_sensors(self, zone_id: int, sensor_type: Optional[str] = None) -> List[ZoneSensor]:
+        """Active ZoneSensors of a zone, optionally of one type"""
+        sensors = self.by_zone.get(zone_id, [])
+        if sensor_type is None:
+            return sensors
+        return [s for s in sensors if s.sensor_type == sensor_type]
+
+    def hvac_for_zone(self, zone_id: int) -> Optional[HVACControl]:
+        """HVACControl of a zone, or None"""
+        return self.hvac_by_zone.get(zone_id)
+
+    def camera_for_zone(self, zone_id: int) -> Optional[ZoneCamera]:
+        """First active ZoneCamera of a zone, or None"""
+        return self.camera_by_zone.get(zone_id)
+
+
+_topology: Optional[ZoneTopology] = None
+_topology_dirty = True
+_topology_lock = threading.Lock()
+
+
+def get_topology() -> ZoneTopology:
+    """Get the current topology, rebuilding it if invalidated or expired"""
+    global _topology, _topology_dirty
+    ttl = getattr(settings, 'TOPOLOGY_CACHE_TTL', 60)
+    topology = _topology
+    if topology is None or _topology_dirty or time.monotonic() - topology.loaded_at >= ttl:
+        with _topology_lock:
+            topology = _topology
+            if topology is None or _topology_dirty or time.monotonic() - topology.loaded_at >= ttl:
+                _topology_dirty = False
+                topology = ZoneTopology.load()
+                _topology = topology
+                logger.debug("Zone topology loaded: %d device(s), %d zone(s)",
+                             len(topology.by_device), len(topology.zones))
+    return topology
+
+
+def invalidate_topology() -> None:
+    """Mark the topology stale; it is rebuilt on next access"""
+    global _topology_dirty
+    _topology_dirty = True
@@ -0,0 +1,55 @@
+"""
+Model signal receivers - keep in-process caches in sync with MySQL
+
+Connected in MonitoringConfig.ready().
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from monitoring.models import Device, User, Zone, ZoneSensor, ZoneCamera, HVACControl
+from monitoring.services import device_cache, topology_service
+
+
+@receiver([post_save, post_delete], sender=Device)
+def _invalidate_device(sender, instance, **kwargs):
+    """Device changed or removed - drop its cached pk resolution"""
+    device_cache.invalidate_device(instance.pk, instance.name)
+
+
+@receiver(post_delete, sender=User)
+def _invalidate_user(sender, instance, **kwargs):
+    """User removed - its devices are cascaded, forget the default user pk"""
+    if instance.username == device_cache.DEFAULT_USERNAME:
+        device_cache.invalidate_default_user()
+
+
+def _runtime_only(update_fields, runtime_fields) -> bool:
+    """True if a save only touched fields the ingest pipeline maintains itself"""
+    return update_fields is not None and set(update_fields) <= runtime_fields
+
+
+@receiver([post_save, post_delete], sender=ZoneSensor)
+def _invalidate_topology_sensor(sender, instance, update_fields=None, **kwargs):
+    """Zone sensor added/changed/removed - rebuild the zone topology"""
+    if not _runtime_only(update_fields, topology_service.ZONE_SENSOR_RUNTIME_FIELDS):
+        topology_service.invalidate_topology()
+
+
+@receiver([post_save, post_delete], sender=Zone)
+def _invalidate_topology_zone(sender, instance, **kwargs):
+    """Zone thresholds changed or zone removed - rebuild the zone topology"""
+    topology_service.invalidate_topology()
+
+
+@receiver([post_save, post_delete], sender=HVACControl)
+def _invalidate_topology_hvac(sender, instance, update_fields=None, **kwargs):
+    """HVAC added/removed or mode changed - rebuild the zone topology"""
+    if not _runtime_only(update_fields, topology_service.HVAC_RUNTIME_FIELDS):
+        topology_service.invalidate_topology()
+
+
+@receiver([post_save, post_delete], sender=ZoneCamera)
+def _invalidate_topology_camera(sender, instance, **kwargs):
+    """Camera added/changed/removed - rebuild the zone -> camera map"""
+    topology_service.invalidate_topology()
@@ -3,10 +3,18 @@ Stream handlers - Message processing logic
 """
 
 import logging
-from monitoring.tasks import handle_payload
+from typing import List
+
+from django.db import InterfaceError, OperationalError
+from pymongo.errors import PyMongoError
+
+from monitoring.tasks import handle_payload, handle_payload_batch
 
 logger = logging.getLogger(__name__)
 
+# Storage outages worth retrying a batch for; anything else fails again on retry
+TRANSIENT_ERRORS = (PyMongoError, OperationalError, InterfaceError)
+
 
 def on_mqtt_message(_client, _userdata, msg):
     """
@@ -39,3 +47,26 @@ def on_kafka_message(payload: str):
         handle_payload(payload)
     except Exception:
         logger.exception("Failed to handle Kafka message")
+
+
+def on_kafka_batch(payloads: List[str]) -> bool:
+    """
+    Process a micro-batch of Kafka messages
+    
+    Args:
+        payloads: List of JSON string payloads
+        
+    Returns:
+        True if the offsets may be committed: the batch was persisted, or it
+        failed on a non-transient error and is dropped. False after a
+        transient storage error (MongoDB/MySQL), so the batch is retried.
+    """
+    try:
+        handle_payload_batch(payloads)
+        return True
+    except TRANSIENT_ERRORS:
+        logger.exception("Failed to persist Kafka batch of %d message(s), will retry", len(payloads))
+        return False
+    except Exception:
+        logger.exception("Dropping Kafka batch of %d message(s) after a non-transient error", len(payloads))
+        return True
@@ -3,7 +3,9 @@ Kafka consumer - Processes sensor data from Kafka topic
 """
 
 import logging
-from confluent_kafka import Consumer, KafkaError
+import time
+from confluent_kafka import Consumer, KafkaError, TopicPartition
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +14,11 @@ KAFKA_BOOTSTRAP = 'iot-kafka:9092'
 KAFKA_TOPIC = 'raw-data'
 GROUP_ID = 'iot-group'
 
+# Back-off before re-consuming a batch that failed to persist, doubled per
+# consecutive failure up to the max
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_BACKOFF_MAX_SECONDS = 60.0
+
 
 def run_kafka_consumer():
     """
@@ -52,6 +59,78 @@ def run_kafka_consumer():
         consumer.close()
 
 
+
+def run_kafka_consumer_batch():
+    """
+    Run Kafka consumer loop in micro-batch mode (blocking)
+    
+    Consumes up to KAFKA_CONSUMER_BATCH_SIZE messages per consume() call and
+    hands them to on_kafka_batch as one list. Offsets are committed manually,
+    and only after the whole batch has been persisted; a batch that failed
+    on a transient error (see on_kafka_batch) is rewound and consumed again
+    with capped exponential backoff until it succeeds (at-least-once
+    delivery), however long MongoDB/MySQL are down.
+    """
+    from .handlers import on_kafka_batch
+    
+    batch_size = getattr(settings, 'KAFKA_CONSUMER_BATCH_SIZE', 500)
+    batch_timeout = getattr(settings, 'KAFKA_CONSUMER_BATCH_TIMEOUT', 1.0)
+    
+    consumer = Consumer({
+        'bootstrap.servers': KAFKA_BOOTSTRAP,
+        'group.id': GROUP_ID,
+        'auto.offset.reset': 'latest',  # Only read NEW messages
+        'enable.auto.commit': False,
+    })
+    
+    consumer.subscribe([KAFKA_TOPIC])
+    logger.info("Kafka batch consumer subscribed to %s (batch_size=%d, timeout=%.1fs)",
+                KAFKA_TOPIC, batch_size, batch_timeout)
+
+    # Consecutive failed attempts (drives the backoff)
+    failures = 0
+
+    try:
+        while True:
+            msgs = consumer.consume(num_messages=batch_size, timeout=batch_timeout)
+            if not msgs:
+                continue
+
+            payloads = []
+            first_offsets = {}
+            for msg in msgs:
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        logger.error("Kafka error: %s", msg.error())
+                    continue
+                key = (msg.topic(), msg.partition())
+                first_offsets.setdefault(key, msg.offset())
+                try:
+                    payloads.append(msg.value().decode('utf-8'))
+                except Exception:
+                    logger.warning("Skip undecodable Kafka message at %s [%d] @ %d",
+                                   msg.topic(), msg.partition(), msg.offset())
+
+            if not first_offsets:
+                continue
+
+            if not payloads or on_kafka_batch(payloads):
+                consumer.commit(asynchronous=False)
+                failures = 0
+                continue
+
+            # Rewind every partition to the start of the failed batch
+            for (topic, partition), offset in first_offsets.items():
+                consumer.seek(TopicPartition(topic, partition, offset))
+            delay = min(RETRY_BACKOFF_SECONDS * 2 ** min(failures, 16), RETRY_BACKOFF_MAX_SECONDS)
+            failures += 1
+            logger.warning("Kafka batch of %d message(s) will be retried in %.0fs (attempt %d)",
+                           len(payloads), delay, failures + 1)
+            time.sleep(delay)
+    finally:
+        consumer.close()
+
+
 if __name__ == "__main__":
     import os
     import sys
@@ -4,6 +4,10 @@ Stream runner - Manages MQTT and Kafka stream threads
 
 import logging
 import threading
+import time
+from typing import Any, Callable
+
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +16,30 @@ _streams_started = False
 _streams_lock = threading.Lock()
 
 
+def run_periodic(name: str, interval: float, task: Callable[[], Any], run_first: bool = False):
+    """
+    Call task every interval seconds, forever (blocking)
+
+    Meant as the target of a background thread; a failing call is logged
+    and the loop carries on.
+
+    Args:
+        name: Loop name for log messages
+        interval: Seconds between calls
+        task: Callable without arguments
+        run_first: Call task right away instead of after the first interval
+    """
+    logger.info("%s started (interval=%ss)", name, interval)
+    delay = 0 if run_first else interval
+    while True:
+        time.sleep(delay)
+        delay = interval
+        try:
+            task()
+        except Exception:
+            logger.exception("%s failed", name)
+
+
 def start_streams_once():
     """
     Start MQTT and Kafka streams once (thread-safe)
@@ -32,9 +60,24 @@ def start_streams_once():
         from .mqtt_subscriber import run_mqtt_loop
         threading.Thread(target=run_mqtt_loop, daemon=True).start()
         
-        # Start Kafka consumer thread
-        from .kafka_consumer import run_kafka_consumer
-        threading.Thread(target=run_kafka_consumer, daemon=True).start()
+        # Start Kafka consumer thread (micro-batch mode by default)
+        from .kafka_consumer import run_kafka_consumer, run_kafka_consumer_batch
+        if getattr(settings, 'KAFKA_CONSUMER_BATCH_MODE', True):
+            threading.Thread(target=run_kafka_consumer_batch, daemon=True).start()
+        else:
+            threading.Thread(target=run_kafka_consumer, daemon=True).start()
+        
+        # Start presence sweeper (online -> offline transitions)
+        from monitoring.services import run_presence_sweeper
+        threading.Thread(target=run_presence_sweeper, daemon=True).start()
+        
+        # Start HVAC control loop (debounced zone control, same process as ingest)
+        from monitoring.services import run_hvac_control_loop
+        threading.Thread(target=run_hvac_control_loop, daemon=True).start()
+        
+        # Start retention loop (archive old raw readings, trim rollups/search index)
+        from monitoring.services import run_retention_loop
+        threading.Thread(target=run_retention_loop, daemon=True).start()
         
         _streams_started = True
         logger.info("✓ MQTT & Kafka streams started.")
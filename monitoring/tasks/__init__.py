@@ -7,6 +7,7 @@ Celery tasks for async processing:
 
 from .main import (
     handle_payload,
+    handle_payload_batch,
     ping,
     mqtt_subscribe_task,
     kafka_consumer_task
@@ -14,6 +15,7 @@ from .main import (
 
 __all__ = [
     'handle_payload',
+    'handle_payload_batch',
     'ping',
     'mqtt_subscribe_task',
     'kafka_consumer_task',
@@ -6,44 +6,58 @@ Handles MQTT and Kafka message processing using services layer.
 
 import json
 import logging
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 from celery import shared_task
 from celery.signals import worker_ready
 from django.utils import timezone
 
-from monitoring.models import Device, User, Reading, ReadingClient, ZoneSensor
+from monitoring.models import Reading, ZoneSensor, get_reading_client
 from monitoring.services import (
-    cache_latest_reading,
-    check_building_thresholds,
-    auto_control_hvac
+    cache_latest_readings,
+    check_building_thresholds_batch,
+    get_hvac_controller,
+    get_reading_indexer,
+    resolve_device_pk,
+    get_topology,
+    get_sensor_rules
 )
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s [%(levelname)s] %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def handle_payload(payload: str):
-    """
-    Process sensor reading payload from Kafka
-    
-    Steps:
-    1. Parse JSON payload
-    2. Ensure User and Device exist in MySQL
-    3. Store Reading in MongoDB
-    4. Cache latest reading in Redis
-    5. Index to OpenSearch
-    6. Check Smart Building thresholds
-    7. Auto-control HVAC
+@dataclass
+class ParsedPayload:
+    """A decoded sensor payload with normalized device_id and timestamp"""
+    data: Dict[str, Any]
+    device_id: int
+    timestamp: datetime
+
+
+def _parse_payload(payload: str) -> Optional[ParsedPayload]:
     """
-    logger.info("=== handle_payload CALLED === payload: %s", payload)
+    Parse a JSON payload and normalize its device_id and timestamp
 
+    Returns:
+        ParsedPayload, or None if the payload is not a valid JSON object
+        or has no device_id
+    """
     try:
         data = json.loads(payload)
-        logger.info("Parsed JSON data: %s", data)
     except Exception:
         logger.warning("Skip invalid JSON: %s", payload)
-        return
+        return None
+
+    if not isinstance(data, dict):
+        logger.warning("Skip non-object payload: %s", payload)
+        return None
+
+    if data.get('device_id') is None:
+        logger.warning("Skip payload without device_id: %s", payload)
+        return None
 
     # Normalize timestamp
     ts = data.get('timestamp')
@@ -56,118 +70,237 @@ def handle_payload(payload: str):
     else:
         ts = timezone.now()
 
-    # ============ MYSQL (ORM 'default') ============
-    # Ensure a default user exists
-    user, created_user = User.objects.get_or_create(username='default_user')
-    logger.info("User get_or_create: username=%s, id=%s, created=%s", 
-                 user.username, user.id, created_user)
-
-    # Create or get a Device
-    device_name = f"Device {data.get('device_id')}"
-    device, created_device = Device.objects.get_or_create(
-        name=device_name,
-        defaults={'user': user},
+    # Normalize device_id to int when possible
+    try:
+        device_id_val = int(data.get('device_id'))
+    except Exception:
+        device_id_val = 0
+
+    return ParsedPayload(data=data, device_id=device_id_val, timestamp=ts)
+
+
+def _resolve_devices(items: List[ParsedPayload]) -> Dict[Any, int]:
+    """
+    Resolve the MySQL Device pk for each distinct payload device_id
+
+    Served from the in-process device cache; only a cache miss hits MySQL
+    (get_or_create of the default User and the Device).
+
+    Returns:
+        Mapping of raw payload device_id -> Device pk
+    """
+    devices: Dict[Any, int] = {}
+    for item in items:
+        raw_device_id = item.data.get('device_id')
+        if raw_device_id not in devices:
+            devices[raw_device_id] = resolve_device_pk(raw_device_id)
+    return devices
+
+
+def _to_reading(item: ParsedPayload) -> Reading:
+    return Reading(
+        device_id=item.device_id,
+        temperature=item.data.get('temperature'),
+        humidity=item.data.get('humidity'),
+        timestamp=item.timestamp,
     )
-    logger.info("Device get_or_create: name=%s, id=%s, created=%s", 
-                 device.name, device.id, created_device)
 
-    # ============ MONGODB ============
-    # Persist reading via pymongo-backed ReadingClient
+
+def _store_readings(items: List[ParsedPayload]) -> Tuple[List[ParsedPayload], int]:
+    """
+    Bulk insert readings into MongoDB via ReadingClient.insert_readings
+
+    Duplicate (device_id, timestamp) readings are rejected by the unique index
+    and silently skipped.
+
+    Returns:
+        (inserted items, number of non-duplicate failures)
+    """
+    result = get_reading_client().insert_readings(map(_to_reading, items))
+
+    rejected = set(result.duplicate_indexes) | set(result.failed_indexes)
+    inserted = [item for index, item in enumerate(items) if index not in rejected]
+    logger.info("MongoDB insert_readings: inserted=%d, duplicates=%d, failed=%d",
+                result.inserted, result.duplicates, result.failed)
+    return inserted, result.failed
+
+
+def _update_rollups(items: List[ParsedPayload]) -> None:
+    """
+    Fold the inserted readings into the minute/hour/day rollups
+
+    One bulk upsert per rollup level for the whole micro-batch. A failure is
+    logged, not raised: the raw readings are already stored and a redelivered
+    batch would be skipped as duplicates, so the affected days are repaired
+    with scripts/backfill_rollups.py instead.
+    """
+    if not items:
+        return
     try:
-        # Normalize device_id to int when possible
-        raw_device_id = data.get('device_id')
-        try:
-            device_id_val = int(raw_device_id)
-        except Exception:
-            device_id_val = 0
-
-        reading = Reading(
-            device_id=device_id_val,
-            temperature=data.get('temperature'),
-            humidity=data.get('humidity'),
-            timestamp=ts,
-        )
-        client = ReadingClient()
-        inserted_id = client.insert_reading(reading)
-        logger.info("MongoDB insert result: inserted_id=%s", inserted_id)
-        
-        if inserted_id is None:
-            logger.error("Failed to insert reading into MongoDB for payload: %s", payload)
-        else:
-            # ============ REDIS CACHE ============
-            # Cache latest reading after successful MongoDB insert
-            cache_latest_reading(data['device_id'], data, ttl=60)
-            
-            # ============ OPENSEARCH ============
-            # Index to OpenSearch after successful MongoDB insert
-            try:
-                from opensearchpy import OpenSearch
-                os_client = OpenSearch(
-                    hosts=[{'host': 'opensearch', 'port': 9200}],
-                    use_ssl=False,
-                    verify_certs=False
-                )
-                
-                doc_id = f"{device_id_val}_{ts.isoformat()}"
-                doc_body = {
-                    'device_id': device_id_val,
-                    'temperature': data.get('temperature'),
-                    'humidity': data.get('humidity'),
-                    'timestamp': ts.isoformat()
+        touched = get_reading_client().update_rollups(map(_to_reading, items))
+        logger.debug("Rollups updated: %d bucket(s)", touched)
+    except Exception as e:
+        logger.error("Failed to update rollups for %d reading(s): %s", len(items), e)
+
+
+def _index_readings(items: List[ParsedPayload]) -> None:
+    """
+    Queue readings on the shared OpenSearch bulk indexer
+
+    Documents are flushed to the sensor-readings index with _bulk when the
+    indexer's size or age threshold is hit.
+    """
+    if not items:
+        return
+    try:
+        indexer = get_reading_indexer()
+        for item in items:
+            indexer.add(
+                f"{item.device_id}_{item.timestamp.isoformat()}",
+                {
+                    'device_id': item.device_id,
+                    'temperature': item.data.get('temperature'),
+                    'humidity': item.data.get('humidity'),
+                    'timestamp': item.timestamp.isoformat()
                 }
-                
-                os_client.index(
-                    index='sensor-readings',
-                    id=doc_id,
-                    body=doc_body
-                )
-                logger.info("✓ Indexed to OpenSearch: %s", doc_id)
-            except Exception as e:
-                logger.warning("Failed to index to OpenSearch: %s", e)
-                
-    except Exception:
-        logger.exception("Failed to persist reading")
-    
-    # ============ SMART BUILDING LOGIC ============
+            )
+    except Exception as e:
+        logger.warning("Failed to queue readings for OpenSearch: %s", e)
+
+
+def _cache_latest(items: List[ParsedPayload]) -> None:
+    """Cache the latest reading of each device in Redis (one pipeline)"""
+    if not items:
+        return
+    try:
+        cache_latest_readings([(item.data['device_id'], item.data) for item in items])
+    except Exception as e:
+        logger.warning("Failed to cache latest readings: %s", e)
+
+
+def _process_smart_building(devices: Dict[Any, int], items: List[ParsedPayload]) -> None:
+    """
+    Smart Building fan-out for a micro-batch
+
+    Updates the latest reading of each affected zone sensor (one UPDATE per
+    sensor per batch), evaluates all readings against zone thresholds in one
+    vectorized pass, then auto-controls HVAC once per affected zone.
+    """
     try:
-        # Check if this device belongs to a Smart Building zone
-        zone_sensor = ZoneSensor.objects.filter(
-            device__id=device.id,
-            is_active=True
-        ).select_related('zone').first()
+        topology = get_topology()
+        sensor_rules = get_sensor_rules()
+        readings = []
+        touched_sensors = {}
         
-        if zone_sensor:
-            logger.info("Device belongs to Smart Building zone: %s", zone_sensor.zone.name)
-            
-            # Update sensor latest reading
-            if zone_sensor.sensor_type == 'TEMPERATURE':
-                zone_sensor.latest_reading = data.get('temperature')
-            elif zone_sensor.sensor_type == 'HUMIDITY':
-                zone_sensor.latest_reading = data.get('humidity')
+        for item in items:
+            device_pk = devices[item.data.get('device_id')]
+            # Zone sensors backed by this device (in-memory topology, no query on miss)
+            zone_sensors = topology.sensors_for_device(device_pk)
+            if not zone_sensors:
+                continue
+            readings.append((device_pk, item.data, item.timestamp))
             
-            zone_sensor.latest_reading_time = ts
-            zone_sensor.save()
-            logger.info("✓ Updated zone sensor reading: %s = %s", 
-                        zone_sensor.sensor_type, zone_sensor.latest_reading)
-            
-            # Check thresholds and create alerts if needed
-            alerts_count = check_building_thresholds(
-                zone_sensor, 
-                data.get('temperature'), 
-                data.get('humidity')
+            for zone_sensor in zone_sensors:
+                # Update sensor latest reading
+                rule = sensor_rules.get(zone_sensor.sensor_type)
+                value = item.data.get(rule['field']) if rule else None
+                if value is not None:
+                    zone_sensor.latest_reading = value
+                zone_sensor.latest_reading_time = item.timestamp
+                touched_sensors[zone_sensor.pk] = zone_sensor
+        
+        if not readings:
+            return
+        
+        for zone_sensor in touched_sensors.values():
+            ZoneSensor.objects.filter(pk=zone_sensor.pk).update(
+                latest_reading=zone_sensor.latest_reading,
+                latest_reading_time=zone_sensor.latest_reading_time,
             )
-            if alerts_count > 0:
-                logger.info("Created %d alert(s)", alerts_count)
-            
-            # Auto-control HVAC if zone has HVAC system
-            hvac_controlled = auto_control_hvac(zone_sensor.zone)
-            if hvac_controlled:
-                logger.info("✓ HVAC auto-control executed")
+        logger.info("✓ Updated %d zone sensor reading(s)", len(touched_sensors))
+        
+        # Check thresholds and create alerts if needed
+        alerts_count = check_building_thresholds_batch(readings)
+        if alerts_count > 0:
+            logger.info("Created %d alert(s)", alerts_count)
+        
+        # Auto-control HVAC (debounced per zone, writes only on state change)
+        controller = get_hvac_controller()
+        for zone_sensor in touched_sensors.values():
+            controller.observe(zone_sensor)
+        hvac_written = controller.run_due({zs.zone_id for zs in touched_sensors.values()})
+        if hvac_written:
+            logger.info("✓ HVAC auto-control updated %d zone(s)", hvac_written)
             
     except Exception as e:
         logger.warning("Smart Building processing failed: %s", e)
 
 
+def handle_payload_batch(payloads: List[str]) -> int:
+    """
+    Process a micro-batch of sensor reading payloads from Kafka
+    
+    Steps:
+    1. Parse all JSON payloads
+    2. Resolve Device pks (in-process cache, MySQL get_or_create on miss)
+    3. Bulk insert Readings into MongoDB (insert_many, unordered)
+    4. Cache latest readings in Redis (one pipeline)
+    5. Queue for OpenSearch bulk indexing (flushed by size/age)
+    6. Check Smart Building thresholds (vectorized over the batch)
+    7. Auto-control HVAC (debounced per zone)
+    
+    Args:
+        payloads: List of JSON string payloads
+        
+    Returns:
+        Number of readings inserted into MongoDB
+        
+    Raises:
+        Exception if the batch could not be persisted to MySQL/MongoDB
+        (e.g. connection errors), so the caller must not commit the batch
+        offsets. Readings MongoDB rejects individually are logged, not raised.
+    """
+    items = [item for item in map(_parse_payload, payloads) if item is not None]
+    if not items:
+        return 0
+
+    # ============ MYSQL (ORM 'default') ============
+    devices = _resolve_devices(items)
+
+    # ============ MONGODB ============
+    inserted, failed = _store_readings(items)
+    _update_rollups(inserted)
+
+    # ============ REDIS CACHE ============
+    _cache_latest(inserted)
+
+    # ============ OPENSEARCH ============
+    _index_readings(inserted)
+
+    # ============ SMART BUILDING LOGIC ============
+    # Only newly stored readings: a redelivered batch must not re-count
+    # alert occurrences or re-drive HVAC
+    _process_smart_building(devices, inserted)
+
+    if failed:
+        # Per-document write errors fail the same way on every retry
+        logger.error("%d reading(s) rejected by MongoDB and dropped", failed)
+    return len(inserted)
+
+
+def handle_payload(payload: str):
+    """
+    Process a single sensor reading payload from Kafka
+    
+    Runs the same pipeline as handle_payload_batch with a batch of one.
+    """
+    logger.debug("=== handle_payload CALLED === payload: %s", payload)
+    try:
+        handle_payload_batch([payload])
+    except Exception:
+        logger.exception("Failed to persist reading for payload: %s", payload)
+
+
 @shared_task
 def ping():
     """Health check task"""
@@ -3,25 +3,52 @@ Base IoT views - User, Device, Reading ViewSets
 """
 
 import json
+from datetime import datetime, timedelta, timezone as dt_timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from django.utils.dateparse import parse_datetime
+from django.conf import settings
+from django.utils import timezone
 
-from monitoring.models import User, Device, ReadingClient
+from monitoring.models import User, Device, Bucket, get_reading_client
+from monitoring.models.mongodb import DOWNSAMPLE_FIELDS
 from monitoring.serializers import (
     UserSerializer,
     DeviceSerializer,
-    ReadingSerializer,
-    LatestReadingSerializer
+    serialize_readings,
+    serialize_latest_readings,
+    datetime_formatter
 )
+from .pagination import parse_datetime_param, parse_page_params, cursor_response
+from .export import EXPORT_CONTENT_TYPES, export_response
 from monitoring.services import (
     get_latest_reading,
     get_all_latest_readings,
-    get_redis_client
+    get_online_device_ids,
+    get_recently_offline,
+    get_opensearch_client,
+    get_column_cache
 )
 
 
+def _device_ids_param(request):
+    """
+    Sorted distinct ?device_id= values (comma-separated or repeated)
+
+    Raises:
+        ValidationError if a value is not an integer or none is given
+    """
+    raw_ids = ','.join(request.query_params.getlist('device_id'))
+    try:
+        device_ids = sorted({int(value) for value in raw_ids.split(',') if value.strip()})
+    except ValueError:
+        raise ValidationError({'device_id': 'Must be integers.'})
+    if not device_ids:
+        raise ValidationError({'device_id': 'At least one device is required.'})
+    return device_ids
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet for User management (MySQL)"""
     queryset = User.objects.all() 
@@ -35,24 +62,20 @@ class DeviceViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['get']) # Get readings for a specific device
     def readings(self, request, pk=None):
-        """Get readings for a specific device from MongoDB"""
-        device = self.get_object()
-        limit = int(request.query_params.get('limit', 100)) # Default limit 100
-        since_str = request.query_params.get('since') # Optional since parameter
+        """
+        Get readings for a specific device from MongoDB (cursor paginated)
         
-        since = None
-        if since_str:
-            since = parse_datetime(since_str) # Parse since datetime
+        Query parameters: limit, since, before / after (cursor from the
+        X-Next-Cursor / X-Prev-Cursor headers)
+        """
+        device = self.get_object()
+        params = parse_page_params(request)
         
-        client = ReadingClient() # MongoDB client
-        readings = client.find_readings(
-            device_id=device.id,
-            limit=limit,
-            since=since
-        )
+        client = get_reading_client() # Shared MongoDB client
+        readings = client.find_readings_page(device_id=device.id, **params.query_kwargs(device.id))
+        page, has_more = params.trim(readings)
         
-        serializer = ReadingSerializer(readings, many=True)
-        return Response(serializer.data)
+        return cursor_response(request, page, params, has_more, serialize_readings(page))
     
     @action(detail=True, methods=['get']) # Get latest reading for a specific device
     def latest(self, request, pk=None):
@@ -60,90 +83,240 @@ class DeviceViewSet(viewsets.ModelViewSet):
         device = self.get_object()
         data = get_latest_reading(device.id)
         
-        if data:
-            data['status'] = 'online'
-            serializer = LatestReadingSerializer(data)
-            return Response(serializer.data)
+        if data and data['status'] == 'online':
+            return Response(serialize_latest_readings([data])[0])
         else:
             return Response(
                 {'detail': 'No recent data (device offline)'},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(detail=False, methods=['get'])
+    def presence(self, request):
+        """
+        Get online devices and devices that went offline recently (Redis)
+        
+        Query parameters:
+        - offline_minutes: Look-back for offline transitions (default 15)
+        """
+        try:
+            minutes = int(request.query_params.get('offline_minutes', 15))
+        except ValueError:
+            return Response(
+                {'error': 'offline_minutes must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        online = get_online_device_ids()
+        offline = get_recently_offline(minutes)
+        return Response({
+            'online_devices': online,
+            'online_count': len(online),
+            'recently_offline': [
+                {'device_id': device_id, 'last_seen': datetime.fromtimestamp(last_seen, tz=dt_timezone.utc)}
+                for device_id, last_seen in offline
+            ],
+        })
 
 
 class ReadingViewSet(viewsets.ViewSet): 
     """ViewSet for Reading operations (MongoDB via pymongo)"""
     
     def list(self, request):
-        """Get recent readings from MongoDB"""
-        device_id = request.query_params.get('device_id')
-        limit = int(request.query_params.get('limit', 100))
-        since_str = request.query_params.get('since')
+        """
+        Get recent readings from MongoDB (cursor paginated)
         
-        since = None
-        if since_str:
-            since = parse_datetime(since_str)
+        Query parameters: device_id, limit, since, before / after (cursor
+        from the X-Next-Cursor / X-Prev-Cursor headers), fair (all devices:
+        at most limit / devices readings per device, no next page)
+        """
+        device_id = request.query_params.get('device_id')
+        fair = request.query_params.get('fair', '').lower() in ('1', 'true')
+        params = parse_page_params(request)
         
-        client = ReadingClient()
+        client = get_reading_client()
         
         if device_id:
-            readings = client.find_readings(
-                device_id=int(device_id),
-                limit=limit,
-                since=since
+            device_id = int(device_id)
+            readings = client.find_readings_page(device_id=device_id, **params.query_kwargs(device_id))
+            page, has_more = params.trim(readings)
+        elif fair:
+            # Every device gets its share of the page (parallel per-device queries)
+            if params.after is not None:
+                raise ValidationError({'after': 'Not supported with fair=true.'})
+            device_ids = list(Device.objects.values_list('id', flat=True))
+            per_device = -(-params.limit // max(len(device_ids), 1))
+            readings = client.find_feed_per_device(
+                device_ids, per_device, before=params.before, since=params.since
             )
+            page, has_more = readings[:params.limit], False
         else:
-            # Get readings for all devices
-            devices = Device.objects.all()
-            readings = []
-            per_device_limit = max(limit // devices.count(), 10) if devices.exists() else limit
-            
-            for device in devices:
-                device_readings = client.find_readings(
-                    device_id=device.id,
-                    limit=per_device_limit,
-                    since=since
-                )
-                readings.extend(device_readings)
-            
-            readings.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-            readings = readings[:limit]
+            # All devices: one query on the (timestamp, device_id) index
+            readings = client.find_feed_page(
+                limit=params.limit + 1, before=params.before, after=params.after, since=params.since
+            )
+            page, has_more = params.trim(readings)
+        
+        return cursor_response(request, page, params, has_more, serialize_readings(page))
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream readings as NDJSON or CSV (constant memory, oldest first)
+        
+        Readings past retention are read from the Parquet archive.
+        
+        Query parameters:
+        - output: ndjson (default) or csv
+        - device_id: Filter by device (optional)
+        - since / until: ISO datetime bounds (optional)
+        """
+        output = request.query_params.get('output', 'ndjson').lower()
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({'output': f"Must be one of: {', '.join(EXPORT_CONTENT_TYPES)}."})
+        
+        device_id = request.query_params.get('device_id')
+        try:
+            device_id = int(device_id) if device_id else None
+        except ValueError:
+            raise ValidationError({'device_id': 'Must be an integer.'})
+        since = parse_datetime_param(request.query_params, 'since')
+        until = parse_datetime_param(request.query_params, 'until')
         
-        serializer = ReadingSerializer(readings, many=True)
-        return Response(serializer.data)
+        client = get_reading_client()
+        rows = client.iter_history(
+            device_id=device_id,
+            since=since,
+            until=until,
+            batch_size=getattr(settings, 'READINGS_EXPORT_CHUNK_SIZE', 1000),
+        )
+        return export_response(rows, output, chunk_size=getattr(settings, 'READINGS_EXPORT_CHUNK_SIZE', 1000))
+    
+    @action(detail=False, methods=['get'])
+    def downsample(self, request):
+        """
+        Time-bucketed min/max/avg/count per device (MongoDB aggregation)
+        
+        Query parameters:
+        - device_id: One or more devices (comma-separated or repeated)
+        - bucket: Bucket size, 1m ... 1d (default 1h)
+        - since / until: ISO datetime range (default: last 24 hours), widened
+          to whole buckets
+        - raw: true to skip the rollups and aggregate raw readings
+        """
+        device_ids = _device_ids_param(request)
+        try:
+            bucket = Bucket.parse(request.query_params.get('bucket', '1h'))
+        except ValueError as e:
+            raise ValidationError({'bucket': str(e)})
+        
+        until = parse_datetime_param(request.query_params, 'until') or timezone.now()
+        since = parse_datetime_param(request.query_params, 'since') or until - timedelta(days=1)
+        since, until = (
+            timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+            for value in (since, until)
+        )
+        if since >= until:
+            raise ValidationError({'since': 'since must be before until.'})
+        # Whole buckets only, which also lets the rollups answer the query
+        since, until = bucket.floor(since), bucket.ceil(until)
+        
+        max_buckets = getattr(settings, 'READINGS_MAX_BUCKETS', 5000)
+        if (until - since).total_seconds() / bucket.seconds > max_buckets:
+            raise ValidationError({'bucket': f'Too many buckets (max {max_buckets}); use a larger bucket.'})
+        
+        client = get_reading_client()
+        raw = request.query_params.get('raw', '').lower() in ('1', 'true')
+        rollup = None if raw else client.rollup_for(bucket, since, until)
+        rows = client.downsample(device_ids, since, until, bucket, raw=rollup is None, level=rollup)
+        
+        fmt = datetime_formatter()
+        series = {device_id: [] for device_id in device_ids}
+        for row in rows:
+            point = {'timestamp': fmt(row['bucket']), 'count': row['count']}
+            for name in DOWNSAMPLE_FIELDS:
+                count = row[f'{name}_count']
+                point[name] = {
+                    'min': row[f'{name}_min'],
+                    'max': row[f'{name}_max'],
+                    'avg': row[f'{name}_sum'] / count if count else None,
+                }
+            series[row['device_id']].append(point)
+        
+        return Response({
+            'bucket': request.query_params.get('bucket', '1h'),
+            'since': fmt(since),
+            'until': fmt(until),
+            'source': f'rollup_{rollup.label}' if rollup else 'raw',
+            'series': [{'device_id': device_id, 'points': points} for device_id, points in series.items()],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Per-device count, first/last and min/max/avg (local column cache)
+        
+        Answered from the memory-mapped column cache with NumPy slicing,
+        refreshed incrementally from MongoDB/archive (see column_cache).
+        Devices not cached yet are built in the background and returned as
+        {device_id, warming: true} with status 202; retry shortly.
+        
+        Query parameters:
+        - device_id: One or more devices (comma-separated or repeated)
+        - since / until: ISO datetime range (optional)
+        """
+        device_ids = _device_ids_param(request)
+        since = parse_datetime_param(request.query_params, 'since')
+        until = parse_datetime_param(request.query_params, 'until')
+        
+        cache = get_column_cache()
+        fmt = datetime_formatter()
+        results = []
+        warming = False
+        for device_id in device_ids:
+            if not cache.ready(device_id):
+                cache.warm_up(device_id)
+                results.append({'device_id': device_id, 'warming': True})
+                warming = True
+                continue
+            summary = cache.summary(device_id, since, until)
+            summary['first'] = fmt(summary['first'])
+            summary['last'] = fmt(summary['last'])
+            results.append(dict(device_id=device_id, **summary))
+        return Response(results, status=status.HTTP_202_ACCEPTED if warming else status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'])
     def latest_all(self, request):
         """Get latest readings for all devices from Redis cache"""
         results = get_all_latest_readings()
-        serializer = LatestReadingSerializer(results, many=True)
-        return Response(serializer.data)
+        return Response(serialize_latest_readings(results))
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Get statistics about readings"""
-        client = ReadingClient()
-        client._connect()
+        """
+        Get statistics about readings
         
-        total_count = client._collection.count_documents({}) 
+        Counts come from the incrementally maintained reading counters
+        (O(devices)); pass exact=true to count by scanning the collection.
+        """
+        client = get_reading_client()
+        exact = request.query_params.get('exact', '').lower() in ('1', 'true')
         
-        pipeline = [ 
-            {"$group": {"_id": "$device_id", "count": {"$sum": 1}}},
-            {"$sort": {"_id": 1}}
-        ]
-        by_device = list(client._collection.aggregate(pipeline))
+        if exact:
+            total_count, by_device = client.exact_reading_counts()
+            source = 'scan'
+        else:
+            total_count, by_device, from_counters = client.reading_counts()
+            source = 'counters' if from_counters else 'estimate'
         
-        redis_client = get_redis_client()
-        active_devices = []
-        for key in redis_client.scan_iter("latest:device*"):
-            device_id = key.split('device')[1]
-            active_devices.append(int(device_id))
+        active_devices = get_online_device_ids()
         
         return Response({
             'total_readings': total_count,
             'readings_by_device': by_device,
-            'active_devices': sorted(active_devices),
-            'active_count': len(active_devices)
+            'active_devices': active_devices,
+            'active_count': len(active_devices),
+            'source': source,
         })
     
     @action(detail=False, methods=['get'])
@@ -158,14 +331,9 @@ class ReadingViewSet(viewsets.ViewSet):
         Returns temperature and humidity statistics (avg, min, max, count)
         """
         try:
-            from opensearchpy import OpenSearch
             from datetime import datetime, timedelta
             
-            os_client = OpenSearch(
-                hosts=[{'host': 'opensearch', 'port': 9200}],
-                use_ssl=False,
-                verify_certs=False
-            )
+            os_client = get_opensearch_client()
             
             # Build query filter
             query = {"bool": {"must": []}}
@@ -289,14 +457,9 @@ class ReadingViewSet(viewsets.ViewSet):
         - limit: Max results (default 100)
         """
         try:
-            from opensearchpy import OpenSearch
             from datetime import datetime, timedelta
             
-            os_client = OpenSearch(
-                hosts=[{'host': 'opensearch', 'port': 9200}],
-                use_ssl=False,
-                verify_certs=False
-            )
+            os_client = get_opensearch_client()
             
             # Build query
             query = {"bool": {"must": []}}
@@ -402,19 +565,15 @@ def latest_reading(request, device_id):
     data = get_latest_reading(device_id)
     
     if data:
-        serializer = ReadingSerializer(data)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return Response(serialize_readings([data])[0], status=status.HTTP_200_OK)
     
-    # Fallback to MongoDB
+    # Fallback to MongoDB (not re-cached: that would mark the device online)
     try:
-        client = ReadingClient()
+        client = get_reading_client()
         readings = client.find_readings(device_id=int(device_id), limit=1)
         
         if readings:
-            from monitoring.services import cache_latest_reading
-            serializer = ReadingSerializer(readings[0])
-            cache_latest_reading(device_id, serializer.data)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(serialize_readings(readings)[0], status=status.HTTP_200_OK)
         else:
             return Response({"error": "No data found"}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
@@ -6,8 +6,9 @@ from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Prefetch
 
-from monitoring.models import Building, Zone
+from monitoring.models import Building, Zone, ZoneCamera
 from monitoring.serializers import (
     BuildingSerializer,
     ZoneDetailSerializer,
@@ -15,6 +16,28 @@ from monitoring.serializers import (
 )
 
 
+def _zones_with_relations(zones):
+    """
+    Zones with sensors, active cameras and HVAC loaded up front
+
+    A constant number of queries however many zones there are: zone.sensors.all()
+    and zone.current_status read the prefetched sensors, zone.active_cameras
+    holds the active cameras and hasattr(zone, 'hvac') reads the joined row.
+    """
+    return zones.select_related('hvac').prefetch_related(
+        'sensors',
+        Prefetch('cameras', queryset=ZoneCamera.objects.filter(is_active=True), to_attr='active_cameras'),
+    )
+
+
+def _average_reading(sensors, sensor_type):
+    values = [
+        s.latest_reading for s in sensors
+        if s.sensor_type == sensor_type and s.is_active and s.latest_reading is not None
+    ]
+    return round(sum(values) / len(values), 1) if values else None
+
+
 class BuildingViewSet(viewsets.ModelViewSet):
     """ViewSet for Building management"""
     queryset = Building.objects.all()
@@ -24,19 +47,11 @@ class BuildingViewSet(viewsets.ModelViewSet):
     def overview(self, request, pk=None):
         """Get building overview with all zones status"""
         building = self.get_object()
-        zones = building.zones.all()
+        zones = _zones_with_relations(building.zones.all())
         
         zone_data = []
         for zone in zones:
-            # Get average temperature
-            temp_sensors = zone.sensors.filter(sensor_type='TEMPERATURE', is_active=True)
-            temps = [s.latest_reading for s in temp_sensors if s.latest_reading is not None]
-            avg_temp = round(sum(temps) / len(temps), 1) if temps else None
-            
-            # Get average humidity
-            humid_sensors = zone.sensors.filter(sensor_type='HUMIDITY', is_active=True)
-            humids = [s.latest_reading for s in humid_sensors if s.latest_reading is not None]
-            avg_humid = round(sum(humids) / len(humids), 1) if humids else None
+            sensors = zone.sensors.all()
             
             zone_data.append({
                 'id': zone.id,
@@ -45,8 +60,8 @@ class BuildingViewSet(viewsets.ModelViewSet):
                 'zone_type': zone.zone_type,
                 'zone_type_display': zone.get_zone_type_display(),
                 'status': zone.current_status,
-                'temperature': avg_temp,
-                'humidity': avg_humid,
+                'temperature': _average_reading(sensors, 'TEMPERATURE'),
+                'humidity': _average_reading(sensors, 'HUMIDITY'),
                 'target_temperature': zone.target_temperature,
                 'temp_range': [zone.temp_min, zone.temp_max],
                 'cameras': [
@@ -56,7 +71,7 @@ class BuildingViewSet(viewsets.ModelViewSet):
                         'hls_url': c.hls_url,
                         'webrtc_url': c.webrtc_url
                     }
-                    for c in zone.cameras.filter(is_active=True)
+                    for c in zone.active_cameras
                 ],
                 'has_hvac': hasattr(zone, 'hvac')
             })
@@ -148,7 +163,9 @@ class ZoneViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        zones = Zone.objects.filter(building_id=building_id).order_by('floor', 'name')
+        zones = _zones_with_relations(
+            Zone.objects.filter(building_id=building_id).order_by('floor', 'name')
+        )
         
         # Group by floor
         floors_data = {}
@@ -163,8 +180,8 @@ class ZoneViewSet(viewsets.ModelViewSet):
                 'zone_type': zone.zone_type,
                 'zone_type_display': zone.get_zone_type_display(),
                 'status': zone.current_status,
-                'sensor_count': zone.sensors.filter(is_active=True).count(),
-                'camera_count': zone.cameras.filter(is_active=True).count(),
+                'sensor_count': sum(1 for s in zone.sensors.all() if s.is_active),
+                'camera_count': len(zone.active_cameras),
                 'has_hvac': hasattr(zone, 'hvac')
             })
         
@@ -0,0 +1,89 @@
+"""
+Streaming reading export - NDJSON / CSV straight from the MongoDB cursor
+
+Rows are encoded as they come off the cursor and flushed in chunks of
+READINGS_EXPORT_CHUNK_SIZE rows, so peak memory does not grow with the
+export size and the first bytes go out as soon as the first batch arrives.
+"""
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from monitoring.serializers import datetime_formatter
+
+EXPORT_FIELDS = ('device_id', 'temperature', 'humidity', 'timestamp')
+
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+_encode_json = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]], chunk_size: int = 1000) -> Iterator[str]:
+    """One JSON object per line"""
+    fmt = datetime_formatter()
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            _encode_json({
+                'device_id': row.get('device_id'),
+                'temperature': row.get('temperature'),
+                'humidity': row.get('humidity'),
+                'timestamp': fmt(row.get('timestamp')),
+            }) + '\n'
+            for row in chunk
+        )
+
+
+def iter_csv(rows: Iterable[Dict[str, Any]], chunk_size: int = 1000) -> Iterator[str]:
+    """Header line, then one CSV line per reading"""
+    fmt = datetime_formatter()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+
+    for chunk in _chunks(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            (row.get('device_id'), row.get('temperature'), row.get('humidity'),
+             fmt(row.get('timestamp')))
+            for row in chunk
+        )
+        yield buffer.getvalue()
+
+
+def export_response(rows: Iterable[Dict[str, Any]], output: str, chunk_size: int = 1000) -> StreamingHttpResponse:
+    """
+    Streaming download of readings
+
+    Args:
+        rows: Reading documents (e.g. ReadingClient.iter_readings())
+        output: 'ndjson' or 'csv'
+        chunk_size: Rows per streamed chunk
+    """
+    encode = iter_csv if output == 'csv' else iter_ndjson
+    response = StreamingHttpResponse(encode(rows, chunk_size), content_type=EXPORT_CONTENT_TYPES[output])
+    filename = f"readings_{timezone.now():%Y%m%dT%H%M%S}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    # Don't let a proxy buffer the whole export before the first byte
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,164 @@
+"""
+Keyset (cursor) pagination for MongoDB reading endpoints
+
+Pages are addressed by opaque cursors that encode the (timestamp, device_id)
+of the last/first reading of a page, so every page is one index range scan
+however deep into the history it is. The response body stays a plain list
+of readings; cursors are returned in headers:
+
+- Link: <...?before=...>; rel="next", <...?after=...>; rel="prev"
+- X-Next-Cursor: pass as ?before= for older readings
+- X-Prev-Cursor: pass as ?after= for newer readings
+"""
+
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = Tuple[datetime.datetime, int]
+
+
+def encode_cursor(reading: Dict[str, Any]) -> str:
+    """Opaque cursor for a reading document"""
+    raw = json.dumps([reading['timestamp'].isoformat(), reading['device_id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(value: str) -> Cursor:
+    """
+    Decode a cursor from encode_cursor
+
+    Raises:
+        ValidationError if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+        timestamp, device_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(timestamp), int(device_id)
+    except (ValueError, TypeError):
+        raise ValidationError({'cursor': 'Invalid cursor.'})
+
+
+def parse_datetime_param(params, name: str) -> Optional[datetime.datetime]:
+    """
+    Parse an optional ISO datetime query parameter
+
+    Returns:
+        The datetime, or None if the parameter is missing or empty
+
+    Raises:
+        ValidationError if the value is not a valid ISO datetime
+    """
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        # Well-formed but out of range, e.g. month 13
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: 'Must be an ISO datetime.'})
+    return parsed
+
+
+@dataclass
+class PageParams:
+    """Parsed ?limit=&before=&after=&since= query parameters"""
+    limit: int
+    before: Optional[Cursor] = None
+    after: Optional[Cursor] = None
+    since: Optional[datetime.datetime] = None
+
+    def query_kwargs(self, device_id: int) -> Dict[str, Any]:
+        """
+        ReadingClient.find_readings_page() arguments for one device
+
+        Readings are ordered by (timestamp, device_id), so a device sorting
+        before/after the cursor's device also includes the cursor timestamp.
+        Asks for limit + 1 readings to detect a further page.
+        """
+        kwargs: Dict[str, Any] = {'limit': self.limit + 1, 'since': self.since}
+        if self.before is not None:
+            kwargs['before'], cursor_device = self.before
+            kwargs['inclusive'] = device_id < cursor_device
+        elif self.after is not None:
+            kwargs['after'], cursor_device = self.after
+            kwargs['inclusive'] = device_id > cursor_device
+        return kwargs
+
+    def trim(self, readings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Cut readings (newest first, up to limit + 1 past the cursor) to one page
+
+        Returns:
+            (page, has_more)
+        """
+        if self.after is not None:
+            # Paging towards newer readings: keep the ones right after the cursor
+            return readings[-self.limit:], len(readings) > self.limit
+        return readings[:self.limit], len(readings) > self.limit
+
+
+def parse_page_params(request) -> PageParams:
+    """
+    Parse paging query parameters, capping limit at READINGS_MAX_PAGE_SIZE
+
+    Raises:
+        ValidationError on a bad limit/cursor/since or when both before and after are given
+    """
+    params = request.query_params
+    max_size = getattr(settings, 'READINGS_MAX_PAGE_SIZE', 1000)
+    try:
+        limit = int(params.get('limit', 100))
+    except ValueError:
+        raise ValidationError({'limit': 'Must be an integer.'})
+    limit = max(1, min(limit, max_size))
+
+    if params.get('before') and params.get('after'):
+        raise ValidationError({'cursor': 'Use either before or after, not both.'})
+
+    return PageParams(
+        limit=limit,
+        before=decode_cursor(params['before']) if params.get('before') else None,
+        after=decode_cursor(params['after']) if params.get('after') else None,
+        since=parse_datetime_param(params, 'since'),
+    )
+
+
+def cursor_response(request, page: List[Dict[str, Any]], params: PageParams,
+                    has_more: bool, data: Any) -> Response:
+    """
+    Response with the serialized page as body and paging cursors in headers
+
+    Args:
+        page: Readings of the page, newest first
+        params: The request's paging parameters
+        has_more: A page was cut at limit (more readings past its far end)
+        data: Serialized page
+    """
+    response = Response(data)
+    if not page:
+        return response
+
+    url = remove_query_param(remove_query_param(request.build_absolute_uri(), 'before'), 'after')
+    links = []
+    # Older readings exist if this page was cut, or if we paged towards newer ones
+    if has_more or params.after is not None:
+        next_cursor = encode_cursor(page[-1])
+        response['X-Next-Cursor'] = next_cursor
+        links.append(f'<{replace_query_param(url, "before", next_cursor)}>; rel="next"')
+    # Newer readings may always arrive, so the first page links back too
+    prev_cursor = encode_cursor(page[0])
+    response['X-Prev-Cursor'] = prev_cursor
+    links.append(f'<{replace_query_param(url, "after", prev_cursor)}>; rel="prev"')
+    response['Link'] = ', '.join(links)
+    return response
@@ -0,0 +1,64 @@
+"""
+Backfill minute/hour/day rollups from raw MongoDB readings
+Rebuilds one day at a time (ReadingClient.rebuild_rollups), newest first so
+the rollup watermark moves back day by day, and can be re-run safely. Days
+default to the first stored reading up to the start of today (UTC) - today's
+buckets are still being maintained by ingest, so run it again the day after
+rollups were enabled to cover that day.
+Run: docker exec -it iot-app python scripts/backfill_rollups.py [--since 2024-01-01] [--until 2024-02-01] [--device 7]
+"""
+import os
+import sys
+import argparse
+import datetime
+import time
+
+import django
+
+# Setup Django
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_iot.settings')
+django.setup()
+
+from monitoring.models import get_reading_client
+
+parser = argparse.ArgumentParser(description="Backfill reading rollups")
+parser.add_argument('--since', type=datetime.date.fromisoformat, help="First day (default: first reading)")
+parser.add_argument('--until', type=datetime.date.fromisoformat, help="Day after the last one (default: today)")
+parser.add_argument('--device', type=int, action='append', help="Only this device (repeatable)")
+args = parser.parse_args()
+
+print("=" * 60)
+print("MongoDB Rollup Backfill")
+print("=" * 60)
+
+client = get_reading_client()
+if not client.rollups_enabled:
+    print("\n✗ READINGS_ROLLUPS_ENABLED is off")
+    sys.exit(1)
+client._connect()
+
+until = args.until or datetime.datetime.utcnow().date()
+since = args.since
+if since is None:
+    first = client._collection.find_one({}, {"timestamp": 1}, sort=[("timestamp", 1)])
+    if first is None:
+        print("\n   No readings stored, nothing to backfill.")
+        sys.exit(0)
+    since = first["timestamp"].date()
+
+print(f"\nRebuilding {since} .. {until} (exclusive)"
+      + (f" for devices {args.device}" if args.device else " for all devices"))
+
+day = until - datetime.timedelta(days=1)
+started = time.perf_counter()
+while day >= since:
+    start = datetime.datetime.combine(day, datetime.time())
+    t0 = time.perf_counter()
+    client.rebuild_rollups(start, start + datetime.timedelta(days=1), args.device)
+    print(f"   ✓ {day} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    day -= datetime.timedelta(days=1)
+
+print("\n" + "=" * 60)
+print(f"Backfill Complete! ({time.perf_counter() - started:.1f}s)")
+print("=" * 60)
@@ -0,0 +1,102 @@
+"""
+Benchmark reading serializers: DRF Serializer vs fast path
+Compares ReadingSerializer / LatestReadingSerializer (many=True) with
+serialize_readings / serialize_latest_readings on 10k rows and checks that
+both produce identical output. No database needed.
+Run: docker exec -it iot-app python scripts/benchmark_serializers.py [rows]
+"""
+import os
+import sys
+import datetime
+import random
+import time
+
+import django
+
+# Setup Django
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_iot.settings')
+django.setup()
+
+from bson import ObjectId
+from monitoring.serializers import (
+    ReadingSerializer,
+    LatestReadingSerializer,
+    serialize_readings,
+    serialize_latest_readings,
+)
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+REPEAT = 5
+
+
+def make_readings(n):
+    """MongoDB-shaped reading documents (naive UTC datetimes, ObjectId)"""
+    start = datetime.datetime(2025, 1, 1)
+    return [
+        {
+            '_id': ObjectId(),
+            'device_id': random.randint(1, 50),
+            'temperature': round(random.uniform(18, 35), 2),
+            'humidity': round(random.uniform(30, 90), 2),
+            'timestamp': start + datetime.timedelta(seconds=i, microseconds=random.randint(0, 999999)),
+        }
+        for i in range(n)
+    ]
+
+
+def make_latest(n):
+    """Redis-shaped latest readings (ISO string timestamps, status)"""
+    return [
+        {
+            'device_id': i,
+            'temperature': round(random.uniform(18, 35), 2),
+            'humidity': round(random.uniform(30, 90), 2),
+            'timestamp': datetime.datetime(2025, 1, 1, 0, 0, i % 60).isoformat(),
+            'status': random.choice(['online', 'offline']),
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(func, data):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = func(data)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def compare(name, drf, fast, data):
+    drf_time, drf_result = best_of(drf, data)
+    fast_time, fast_result = best_of(fast, data)
+    same = [dict(row) for row in drf_result] == fast_result
+    print(f"\n{name} ({len(data)} rows, best of {REPEAT})")
+    print(f"   DRF serializer : {drf_time * 1000:8.1f} ms")
+    print(f"   Fast path      : {fast_time * 1000:8.1f} ms  ({drf_time / fast_time:.1f}x)")
+    print(f"   Identical output: {'✓' if same else '✗'}")
+    return same
+
+
+print("=" * 60)
+print("Reading Serializer Benchmark")
+print("=" * 60)
+
+ok = compare(
+    "ReadingSerializer",
+    lambda rows: ReadingSerializer(rows, many=True).data,
+    serialize_readings,
+    make_readings(ROWS),
+)
+ok &= compare(
+    "LatestReadingSerializer",
+    lambda rows: LatestReadingSerializer(rows, many=True).data,
+    serialize_latest_readings,
+    make_latest(ROWS),
+)
+
+print("\n" + "=" * 60)
+print("Benchmark Complete!" if ok else "Outputs differ!")
+print("=" * 60)
+sys.exit(0 if ok else 1)
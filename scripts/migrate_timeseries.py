@@ -0,0 +1,83 @@
+"""
+Copy the readings collection into a MongoDB time-series collection
+Copies in _id order, batch by batch, through ReadingClient.insert_readings in
+time-series mode (dedup keys make re-runs safe) and feeds the target's rollups.
+Switch over afterwards with MONGODB_READINGS_TIMESERIES=true and
+MONGODB_READINGS_COLLECTION=<target>, then re-run with --after <last _id> to
+copy readings that arrived meanwhile.
+Run: docker exec -it iot-app python scripts/migrate_timeseries.py [--source readings] [--target readings_ts] [--batch 5000] [--after <ObjectId>]
+"""
+import os
+import sys
+import argparse
+import time
+
+import django
+
+# Setup Django
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_iot.settings')
+django.setup()
+
+from bson import ObjectId
+from monitoring.models import Reading, ReadingClient
+
+parser = argparse.ArgumentParser(description="Copy readings into a time-series collection")
+parser.add_argument('--source', default='readings', help="Regular collection to copy (default: readings)")
+parser.add_argument('--target', default='readings_ts', help="Time-series collection (default: readings_ts)")
+parser.add_argument('--batch', type=int, default=5000, help="Readings per batch (default: 5000)")
+parser.add_argument('--after', type=ObjectId, help="Resume after this source _id")
+args = parser.parse_args()
+
+if args.source == args.target:
+    print("✗ --source and --target must differ (time-series collections cannot be renamed)")
+    sys.exit(1)
+
+print("=" * 60)
+print(f"MongoDB Migration: {args.source} -> {args.target} (time-series)")
+print("=" * 60)
+
+target = ReadingClient(collection_name=args.target, timeseries=True)
+target._connect()
+source = target._client[target.db_name][args.source]
+
+query = {"_id": {"$gt": args.after}} if args.after else {}
+total = source.estimated_document_count()
+print(f"\n   Source readings: ~{total}")
+
+copied = duplicates = failed = 0
+last_id = args.after
+started = time.perf_counter()
+while True:
+    batch = list(source.find(query, {"device_id": 1, "temperature": 1, "humidity": 1, "timestamp": 1})
+                 .sort("_id", 1).limit(args.batch))
+    if not batch:
+        break
+    readings = [
+        Reading(
+            device_id=doc.get("device_id"),
+            temperature=doc.get("temperature"),
+            humidity=doc.get("humidity"),
+            timestamp=doc["timestamp"],
+        )
+        for doc in batch if doc.get("timestamp") is not None
+    ]
+    result = target.insert_readings(readings)
+    rejected = set(result.duplicate_indexes) | set(result.failed_indexes)
+    target.update_rollups(reading for index, reading in enumerate(readings) if index not in rejected)
+
+    copied += result.inserted
+    duplicates += result.duplicates
+    failed += result.failed
+    last_id = batch[-1]["_id"]
+    query = {"_id": {"$gt": last_id}}
+    rate = (copied + duplicates) / (time.perf_counter() - started)
+    print(f"   ✓ copied={copied} duplicates={duplicates} failed={failed} "
+          f"last _id={last_id} ({rate:.0f} readings/s)")
+
+print("\n" + "=" * 60)
+print(f"Migration Complete! copied={copied}, duplicates skipped={duplicates}, failed={failed}")
+if last_id is not None:
+    print(f"Resume later with: --after {last_id}")
+print("=" * 60)
+sys.exit(1 if failed else 0)
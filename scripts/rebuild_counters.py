@@ -0,0 +1,40 @@
+"""
+Rebuild the MongoDB reading counters behind /api/readings/stats/
+Counts every device's readings with a $group scan, replaces the counters
+and marks them seeded. /api/readings/stats/ seeds them by itself on first
+use after an upgrade; run this to repair them (stop ingest for an exact
+count - a batch inserted at the very end of the scan can be off).
+Run: docker exec -it iot-app python scripts/rebuild_counters.py
+"""
+import os
+import sys
+import time
+
+import django
+
+# Setup Django
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_iot.settings')
+django.setup()
+
+from monitoring.models import get_reading_client
+
+print("=" * 60)
+print("MongoDB Reading Counters Rebuild")
+print("=" * 60)
+
+client = get_reading_client()
+
+print(f"\n1. Counting readings...")
+started = time.perf_counter()
+total = client.rebuild_counters()
+print(f"   ✓ {total} readings ({time.perf_counter() - started:.1f}s)")
+
+print(f"\n2. Counters:")
+_, by_device, _ = client.reading_counts()
+for row in by_device:
+    print(f"     - Device {row['_id']}: {row['count']} readings")
+
+print("\n" + "=" * 60)
+print("Rebuild Complete!")
+print("=" * 60)
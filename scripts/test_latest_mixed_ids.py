@@ -0,0 +1,72 @@
+"""
+Test /api/readings/latest_all/ with numeric and non-numeric device ids
+Caches one reading per device through the ingest path, then checks that
+latest_all and presence list every device (numeric ids first, in order).
+Run: docker exec -it iot-app python scripts/test_latest_mixed_ids.py
+"""
+import os
+import sys
+
+import django
+
+# Setup Django
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smart_iot.settings')
+django.setup()
+
+from django.conf import settings
+from rest_framework.test import APIClient
+
+from monitoring.services import cache_latest_readings, clear_device_cache
+
+DEVICE_IDS = [9002, 'test-sensor-a', '9001']
+EXPECTED = [9001, 9002, 'test-sensor-a']
+
+if '*' not in settings.ALLOWED_HOSTS and 'testserver' not in settings.ALLOWED_HOSTS:
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+
+print("=" * 60)
+print("latest_all Mixed Device Id Test")
+print("=" * 60)
+
+failed = False
+try:
+    print(f"\n1. Caching readings for devices {DEVICE_IDS}...")
+    written = cache_latest_readings([
+        (device_id, {'device_id': device_id, 'temperature': 24.0, 'humidity': 55.0,
+                     'timestamp': '2025-10-20T04:00:00'})
+        for device_id in DEVICE_IDS
+    ])
+    print(f"   ✓ Cached {written} device(s)")
+
+    client = APIClient(raise_request_exception=False)
+
+    print(f"\n2. GET /api/readings/latest_all/ ...")
+    response = client.get('/api/readings/latest_all/')
+    ids = [row['device_id'] for row in response.json()] if response.status_code == 200 else []
+    found = [device_id for device_id in ids if device_id in EXPECTED]
+    if response.status_code == 200 and found == EXPECTED:
+        print(f"   ✓ {response.status_code}, test devices in order: {found}")
+    else:
+        failed = True
+        print(f"   ✗ {response.status_code}, test devices: {found} (expected {EXPECTED})")
+
+    print(f"\n3. GET /api/devices/presence/ ...")
+    response = client.get('/api/devices/presence/')
+    online = response.json().get('online_devices', []) if response.status_code == 200 else []
+    found = [device_id for device_id in online if device_id in EXPECTED]
+    if response.status_code == 200 and found == EXPECTED:
+        print(f"   ✓ {response.status_code}, online test devices: {found}")
+    else:
+        failed = True
+        print(f"   ✗ {response.status_code}, online test devices: {found} (expected {EXPECTED})")
+finally:
+    print(f"\n4. Deleting test cache...")
+    for device_id in DEVICE_IDS:
+        clear_device_cache(device_id)
+    print(f"   ✓ Deleted")
+
+print("\n" + "=" * 60)
+print("Test FAILED" if failed else "Test Complete!")
+print("=" * 60)
+sys.exit(1 if failed else 0)
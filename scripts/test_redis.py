@@ -24,22 +24,23 @@ except Exception as e:
     print(f"   ✗ Connection failed: {e}")
     exit(1)
 
+LATEST_READINGS_KEY = "latest:readings"
+LAST_SEEN_KEY = "latest:last_seen"
+
 print(f"\n2. Checking for cached device readings...")
-keys = list(redis_client.scan_iter("latest:device*"))
-print(f"   Found {len(keys)} cached devices:")
-for key in sorted(keys):
-    data = redis_client.get(key)
-    if data:
-        reading = json.loads(data)
-        ttl = redis_client.ttl(key)
-        device_id = key.split('device')[1]
-        print(f"   - Device {device_id}: {reading['temperature']}°C, {reading['humidity']}% (TTL: {ttl}s)")
+cached = redis_client.hgetall(LATEST_READINGS_KEY)
+last_seen = dict(redis_client.zrange(LAST_SEEN_KEY, 0, -1, withscores=True))
+print(f"   Found {len(cached)} cached devices:")
+for device_id in sorted(cached, key=int):
+    reading = json.loads(cached[device_id])
+    age = time.time() - last_seen.get(device_id, 0)
+    print(f"   - Device {device_id}: {reading['temperature']}°C, {reading['humidity']}% (seen {age:.0f}s ago)")
 
-if not keys:
+if not cached:
     print(f"   No cached data found. Run publish.py to generate data.")
 
 print(f"\n3. Testing manual cache set/get...")
-test_key = "latest:device999"
+test_key = "999"
 test_data = {
     "device_id": 999,
     "temperature": 25.5,
@@ -48,25 +49,25 @@ test_data = {
 }
 
 try:
-    redis_client.set(test_key, json.dumps(test_data), ex=10)
-    print(f"   ✓ Set test cache: {test_key}")
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(LATEST_READINGS_KEY, test_key, json.dumps(test_data))
+    pipe.zadd(LAST_SEEN_KEY, {test_key: time.time()})
+    pipe.execute()
+    print(f"   ✓ Set test cache: device {test_key}")
     
-    cached = redis_client.get(test_key)
+    cached = redis_client.hget(LATEST_READINGS_KEY, test_key)
     if cached:
         parsed = json.loads(cached)
         print(f"   ✓ Retrieved: {parsed}")
         
-        ttl = redis_client.ttl(test_key)
-        print(f"   ✓ TTL: {ttl}s")
-    
-    print(f"\n   Waiting 3 seconds...")
-    time.sleep(3)
-    
-    ttl_after = redis_client.ttl(test_key)
-    print(f"   ✓ TTL after 3s: {ttl_after}s")
+        seen = redis_client.zscore(LAST_SEEN_KEY, test_key)
+        print(f"   ✓ Last seen: {time.time() - seen:.1f}s ago")
     
     print(f"\n   Deleting test cache...")
-    redis_client.delete(test_key)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hdel(LATEST_READINGS_KEY, test_key)
+    pipe.zrem(LAST_SEEN_KEY, test_key)
+    pipe.execute()
     print(f"   ✓ Deleted")
     
 except Exception as e:
@@ -74,9 +75,9 @@ except Exception as e:
 
 print(f"\n4. Get all active devices (with data in last 60s)...")
 active_devices = []
-for key in redis_client.scan_iter("latest:device*"):
-    device_id = key.split('device')[1]
-    data = redis_client.get(key)
+online = redis_client.zrangebyscore(LAST_SEEN_KEY, time.time() - 60, '+inf')
+readings = redis_client.hmget(LATEST_READINGS_KEY, online) if online else []
+for device_id, data in zip(online, readings):
     if data:
         reading = json.loads(data)
         active_devices.append({